@@ -1,8 +1,20 @@
 import streamlit as st
 import pandas as pd
+import hashlib
 import io
+import json
+import logging
+import os
+import sys
+import time
+import uuid
 import xlsxwriter
-from solver import run_solver
+from solver import run_solver, los_planning_op, vergelijk_scenarios, diagnoseer, Planner, Rooster, wijzigingen, show_kolommen, OnmogelijkeInvoer, OPLOSSING_GEVONDEN
+from jobs import JobQueue, AFGEROND, KLAAR, FOUT
+from cache import SolveCache, invoer_hash, stats_uit_cache
+from validation import validate_schedule
+import ingest
+import export
 
 # --- PAGINA CONFIGURATIE ---
 st.set_page_config(page_title="Orkest Planner", page_icon="🎻", layout="wide")
@@ -14,6 +26,234 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
+# Rekendetails van elke planning gaan via logging naar de serverlog
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+logger = logging.getLogger(__name__)
+
+# --- CACHES ---
+# Gedeeld tussen reruns en sessies, begrensd (minst recent gebruikt valt eruit).
+# De sleutel is de hash van het bestand plus limieten en regels; het DataFrame zelf
+# (met _ ervoor) hoeft Streamlit dan niet telkens te hashen.
+@st.cache_data(max_entries=8, show_spinner=False)
+def lees_rooster(inhoud, bestandsnaam):
+    return ingest.lees_rooster(inhoud, bestandsnaam)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def _excel_bytes(rooster_sleutel, _dataframe):
+    return export.maak_excel(_dataframe)
+
+
+def excel_bestand(dataframe):
+    # Zelfde rooster (zelfde hash) = zelfde bestand, dus niet opnieuw schrijven
+    return _excel_bytes(export.rooster_hash(dataframe), dataframe)
+
+
+def invoer_sleutel(bestand_hash, limits, regels):
+    return (bestand_hash,
+            json.dumps(limits, sort_keys=True, default=str),
+            json.dumps(regels, sort_keys=True, default=str))
+
+
+def sessie_planner(bestand_hash, df):
+    # Het gebouwde model blijft per sessie bewaard; limieten en regels worden
+    # er bij elke solve in bijgewerkt in plaats van alles opnieuw op te bouwen.
+    # Het oplossen gebeurt in een job (eigen proces): de PuLP vertaling gaat niet
+    # mee (zie PlanningModel.__getstate__) en wordt daar elke keer opnieuw gemaakt.
+    if st.session_state.get('planner_bestand') != bestand_hash:
+        st.session_state['planner'] = Planner(df)
+        st.session_state['planner_bestand'] = bestand_hash
+    return st.session_state['planner']
+
+
+@st.cache_resource
+def job_wachtrij():
+    # Eén wachtrij voor de hele server: hoogstens zoveel solves tegelijk, de rest wacht.
+    # Afgeronde uitkomsten worden per invoer bewaard (zelfde invoer = meteen klaar).
+    return JobQueue(max_tegelijk=int(os.environ.get("FLORE_MAX_SOLVES", 2)))
+
+
+@st.cache_resource
+def schijf_cache():
+    # Uitkomsten op schijf, ook na een herstart en over Streamlit processen heen
+    # (pad en grootte via FLORE_CACHE en FLORE_CACHE_MB, zie cache.py)
+    return SolveCache()
+
+
+def sessie_id():
+    if 'sessie_id' not in st.session_state:
+        st.session_state['sessie_id'] = uuid.uuid4().hex
+    return st.session_state['sessie_id']
+
+
+# --- GEDEELDE INVOER VAN DE FRAGMENTEN ---
+# De widgets staan in fragmenten (zie de planner hieronder); elk onderdeel leest de
+# actuele waarden hier uit session_state in plaats van ze als argument te krijgen.
+STANDAARD_INSTELLINGEN = {'time_limit': 60, 'gap': 0.0, 'threads': 1, 'opsplitsen': False, 'venster': 0,
+                          'portfolio': False}
+
+
+def instelling(sleutel):
+    return st.session_state.get(sleutel, STANDAARD_INSTELLINGEN[sleutel])
+
+
+def huidige_limieten(instrumenten):
+    return {instr: st.session_state.get(f"limit_{instr}", 0) for instr in instrumenten}
+
+
+def huidige_regels():
+    return st.session_state.setdefault('regels', [])
+
+
+def huidige_solver_opties():
+    return dict(backend='portfolio' if instelling('portfolio') else 'pulp',
+                time_limit=instelling('time_limit'), gap=instelling('gap') / 100, threads=instelling('threads'),
+                decompose=instelling('opsplitsen'), venster=instelling('venster'))
+
+
+def planning_sleutel(bestand_hash, instrumenten):
+    sleutel_invoer = invoer_sleutel(bestand_hash, huidige_limieten(instrumenten), huidige_regels())
+    return (sleutel_invoer, tuple(huidige_solver_opties().items()))
+
+
+def stop_verouderd(bestand_hash, instrumenten):
+    # Invoer veranderd terwijl er nog gerekend wordt: die uitkomst is niet meer nodig
+    if job_wachtrij().annuleer_verouderd(f"{sessie_id()}:planning", planning_sleutel(bestand_hash, instrumenten)):
+        st.session_state.pop('planning_job', None)
+        st.session_state.pop('planning_cache_sleutel', None)
+        st.toast("De vorige berekening is gestopt omdat de invoer is veranderd.")
+
+
+def stop_reparatie():
+    # Het bewerkte rooster is veranderd: een reparatie van de vorige versie is niet meer nodig
+    if 'reparatie_job' in st.session_state:
+        job_wachtrij().annuleer(st.session_state.pop('reparatie_job'))
+    for sleutel in ['reparatie_start', 'reparatie_mislukt', 'reparatie_fout']:
+        st.session_state.pop(sleutel, None)
+
+
+def _bytes(waarde, gezien):
+    # Geschatte grootte; gedeelde objecten (bv. de naam-tuples van het originele
+    # en het bewerkte rooster) tellen één keer
+    if id(waarde) in gezien:
+        return 0
+    gezien.add(id(waarde))
+    if isinstance(waarde, Rooster):
+        return waarde.bits.nbytes + sum(_bytes(labels, gezien) for labels in
+                                        (waarde.namen, waarde.instrumenten, waarde.momenten))
+    if isinstance(waarde, Planner):
+        return waarde.model.nbytes
+    if isinstance(waarde, pd.DataFrame):
+        return int(waarde.memory_usage(deep=True).sum())
+    if isinstance(waarde, (list, tuple, set)):
+        return sys.getsizeof(waarde) + sum(_bytes(v, gezien) for v in waarde)
+    if isinstance(waarde, dict):
+        return sys.getsizeof(waarde) + sum(_bytes(k, gezien) + _bytes(v, gezien) for k, v in waarde.items())
+    return sys.getsizeof(waarde)
+
+
+def sessie_geheugen():
+    # Bytes per sleutel in st.session_state (voor de rekendetails en de serverlog)
+    gezien = set()
+    return {str(sleutel): _bytes(waarde, gezien) for sleutel, waarde in st.session_state.items()}
+
+
+def bewaar_uitkomst(status, result, stats, tegenstrijdig=None):
+    st.session_state['oplossing_status'] = status
+    st.session_state['oplossing_df'] = result
+    st.session_state['oplossing_stats'] = stats
+    st.session_state.pop('tegenstrijdig', None)
+    if tegenstrijdig is not None:
+        st.session_state['tegenstrijdig'] = tegenstrijdig
+
+    # Oude handmatige bewerkingen wissen bij nieuwe berekening
+    stop_reparatie()
+    for sleutel in ['bewerkte_df', 'fouten_log', 'reparatie_diff', 'diagnose', 'diagnose_fout']:
+        if sleutel in st.session_state:
+            del st.session_state[sleutel]
+
+    if stats is not None:
+        stats.geheugen = sessie_geheugen()
+        logger.info("sessie %s bewaart %d bytes", sessie_id()[:8], sum(stats.geheugen.values()))
+
+
+@st.fragment(run_every=1)
+def volg_job(wachtrij, job_sleutel, verwerk):
+    # Kijkt elke seconde hoe het met de job in session_state[job_sleutel] gaat, zonder
+    # de rest van de pagina te blokkeren. Klaar: verwerk(job) en de pagina opnieuw tonen.
+    job_id = st.session_state.get(job_sleutel)
+    job = wachtrij.status(job_id) if job_id else None
+    if job is None:
+        st.session_state.pop(job_sleutel, None)
+        return
+
+    if job.status not in AFGEROND:
+        plek = wachtrij.plek_in_wachtrij(job_id)
+        if plek:
+            st.info(f"⏳ Andere planningen zijn nog bezig, jij bent nummer {plek} in de wachtrij.")
+        else:
+            st.progress(job.voortgang() or 0.0, text=f"Puzzelen... ({job.duur():.0f} s)")
+        if st.button("⏹️ Stoppen", key=f"stop_{job_sleutel}"):
+            wachtrij.annuleer(job_id)
+            st.session_state.pop(job_sleutel, None)
+            st.rerun()
+        return
+
+    wachtrij.haal_op(job_id)
+    del st.session_state[job_sleutel]
+    verwerk(job)
+    st.rerun()
+
+
+def verwerk_planning(job):
+    cache_sleutel = st.session_state.pop('planning_cache_sleutel', None)
+    if job.status == KLAAR:
+        status, result, stats = job.resultaat
+        if cache_sleutel is not None and status in ("Optimal", "Feasible", "Infeasible"):
+            schijf_cache().bewaar(cache_sleutel, status, result)
+        bewaar_uitkomst(status, result, stats)
+        if status == "Optimal":
+            st.session_state['ballonnen'] = True
+    elif isinstance(job.fout, OnmogelijkeInvoer):
+        # Presolve: dit kan nooit, de solver is niet eens gestart
+        bewaar_uitkomst("Infeasible", Rooster.leeg(), None, job.fout.meldingen)
+    elif job.status == FOUT:
+        bewaar_uitkomst("Not Solved", Rooster.leeg(), None)
+        st.session_state['planning_fout'] = str(job.fout)
+
+
+def verwerk_reparatie(job):
+    voor_df = st.session_state.pop('reparatie_start', None)
+    if job.status == KLAAR:
+        r_status, r_result, _ = job.resultaat
+        if r_status not in OPLOSSING_GEVONDEN:
+            st.session_state['reparatie_mislukt'] = []
+        elif voor_df is not None:
+            na_df = st.session_state['oplossing_df'].met_vinkjes(r_result.als_bool())
+            st.session_state['reparatie_diff'] = wijzigingen(voor_df, na_df, list(voor_df.momenten))
+            st.session_state['bewerkte_df'] = na_df
+            st.session_state['fouten_log'] = []
+            st.session_state['tabel_versie'] += 1
+    elif isinstance(job.fout, OnmogelijkeInvoer):
+        st.session_state['reparatie_mislukt'] = job.fout.meldingen
+    elif job.status == FOUT:
+        st.session_state['reparatie_fout'] = str(job.fout)
+
+
+def verwerk_diagnose(job):
+    if job.status == KLAAR:
+        st.session_state['diagnose'] = job.resultaat
+    elif job.status == FOUT:
+        st.session_state['diagnose_fout'] = str(job.fout)
+
+
+def verwerk_scenarios(job):
+    if job.status == KLAAR:
+        st.session_state['scenario_tabel'] = job.resultaat
+    elif job.status == FOUT:
+        st.session_state['scenario_fout'] = str(job.fout)
+
+
 # --- DE TABS ---
 tab_setup, tab_planner = st.tabs(["🛠️ Admin Setup", "🎻 Planner"])
 
@@ -88,20 +328,8 @@ with tab_planner:
         config_df = st.data_editor(default_setup, num_rows="dynamic")
         
         if st.button("Genereer mijn Excel-sjabloon"):
-            rows = []
-            show_cols = [f"Show {i+1}" for i in range(num_shows)]
-            
-            for index, row in config_df.iterrows():
-                instr = row['Instrument']
-                count = int(row['Aantal Muzikanten'])
-                
-                for i in range(count):
-                    new_row = {"Naam": f"Naam {i+1}", "Instrument": instr, "Wens": "-"}
-                    for show in show_cols:
-                        new_row[show] = "-"
-                    rows.append(new_row)
-            
-            df_gen = pd.DataFrame(rows)
+            bezetting = zip(config_df['Instrument'], config_df['Aantal Muzikanten'])
+            df_gen = ingest.maak_sjabloon(bezetting, num_shows)
             
             buffer = io.BytesIO()
             with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
@@ -112,364 +340,499 @@ with tab_planner:
             st.download_button("📥 Download Sjabloon", buffer, "Orkest_Data.xlsx")
 
     # --- B. FILE UPLOAD ---
-    uploaded_file = st.file_uploader("Upload je Rooster Excel", type=['xlsx'])
+    uploaded_file = st.file_uploader("Upload je Rooster Excel", type=ingest.FORMATEN)
 
     # !!! ALLES HIERONDER IS INGESPRONGEN OMDAT HET 'df' NODIG HEEFT !!!
     if uploaded_file:
-        df = pd.read_excel(uploaded_file)
-
-        # --- DATA SCHOONMAAK ---
-        df = df.dropna(subset=['Naam', 'Instrument'])
-        cols_to_drop = [c for c in df.columns if 'Tijdstempel' in c or 'Timestamp' in c]
-        df = df.drop(columns=cols_to_drop, errors='ignore')
-        
-        # Splits instrumenten (voor multi-instrumentalisten)
-        df['Instrument'] = df['Instrument'].astype(str).str.split(', ')
-        df = df.explode('Instrument')
-        
-        required = ['Naam', 'Instrument', 'Wens']
-        if not all(col in df.columns for col in required):
-            st.error(f"Je Excel mist verplichte kolommen: {required}")
+        inhoud = uploaded_file.getvalue()
+        bestand_hash = hashlib.sha256(inhoud).hexdigest()
+        try:
+            df = lees_rooster(inhoud, uploaded_file.name)
+        except ValueError as e:
+            st.error(str(e))
             st.stop()
 
         st.success("Bestand ingelezen! ✅")
         
         # --- C. LIMIETEN INSTELLEN (ZIJBALK) ---
-        st.sidebar.header("🎛️ Bezetting")
-        st.sidebar.write("Hoeveel mensen mogen er max per show spelen?")
-
+        # Elk onderdeel hieronder is een fragment: klikken of typen in de zijbalk, de regels,
+        # de editor of de verzendlijst draait alleen dat onderdeel opnieuw, niet het inlezen,
+        # de sjabloonbouwer of de rest van de pagina. Een fragment wordt opnieuw gedraaid met
+        # wat het bij de laatste volledige run kreeg; limieten, instellingen en regels lezen
+        # ze daarom zelf uit session_state (huidige_limieten, huidige_regels, ...).
         instrumenten = df['Instrument'].unique()
-        limits = {} 
-        
-        for instr in instrumenten:
-            aantal_beschikbaar = len(df[df['Instrument'] == instr])
-            limits[instr] = st.sidebar.number_input(
-                f"Max {instr}", 
-                min_value=0, 
-                max_value=aantal_beschikbaar, 
-                value=0,
-                key=f"limit_{instr}"
+        shows = show_kolommen(df)
+
+        @st.fragment
+        def zijbalk():
+            st.header("🎛️ Bezetting")
+            st.write("Hoeveel mensen mogen er max per show spelen?")
+
+            for instr in instrumenten:
+                aantal_beschikbaar = len(df[df['Instrument'] == instr])
+                st.number_input(
+                    f"Max {instr}", 
+                    min_value=0, 
+                    max_value=aantal_beschikbaar, 
+                    value=0,
+                    key=f"limit_{instr}"
+                )
+
+            st.header("⏱️ Rekentijd")
+            st.number_input(
+                "Maximale rekentijd (seconden)", min_value=1, value=STANDAARD_INSTELLINGEN['time_limit'], step=10, key="time_limit"
+            )
+            st.number_input(
+                "Toegestane afstand tot optimaal (%)", min_value=0.0, max_value=50.0, value=STANDAARD_INSTELLINGEN['gap'], step=0.5, key="gap"
+            )
+            st.number_input(
+                "Aantal threads", min_value=1, max_value=os.cpu_count() or 1, value=STANDAARD_INSTELLINGEN['threads'], key="threads"
             )
+            st.checkbox(
+                "Losse groepen parallel oplossen", value=STANDAARD_INSTELLINGEN['opsplitsen'], key="opsplitsen",
+                help="Muzikanten die niets met elkaar te maken hebben (geen gedeeld instrument met limiet, geen regel) worden als aparte puzzels tegelijk opgelost op alle processorkernen."
+            )
+            st.number_input(
+                "Shows per stap (0 = alles tegelijk)", min_value=0, value=STANDAARD_INSTELLINGEN['venster'], step=5, key="venster",
+                help="Voor een heel seizoen met honderden shows: de planner werkt in stappen van zoveel shows (op volgorde van de kolommen) en legt die vast voor hij verder gaat. Wensen lopen mee over het hele seizoen. De rekentijd geldt dan per stap."
+            )
+            st.checkbox(
+                "Meerdere solvers laten racen", value=STANDAARD_INSTELLINGEN['portfolio'], key="portfolio",
+                help="Dezelfde puzzel tegelijk met verschillende solver-instellingen (CBC met andere seeds en strategieën, HiGHS); de eerste die klaar is wint. Helpt als de rekentijd erg wisselt, kost wel een processorkern per deelnemer."
+            )
+            stop_verouderd(bestand_hash, instrumenten)
+
+        with st.sidebar:
+            zijbalk()
 
         # --- D. EXTRA REGELS ---
         st.divider()
-        col1, col2 = st.columns([1, 2])
-        
-        niet_shows = ['Naam', 'Instrument', 'Wens', 'Label', 'Resource_ID', 'Totaal']
-        shows = [c for c in df.columns if c not in niet_shows and c not in ['Tijdstempel', 'Timestamp']]
-
-        with col1:
-            st.subheader("Extra Regels")
-            rule_type = st.selectbox("Type regel", 
-                                     ["-", 
-                                      "Niet Samen (Conflict)", 
-                                      "Altijd Samen", 
-                                      "Persoon doet ALLE shows",
-                                      "Persoon doet specifieke show"])
-
-            if 'regels' not in st.session_state:
-                st.session_state['regels'] = []
-            
-            regels = st.session_state['regels']
-            
-            # --- Invoer velden afhankelijk van regel type ---
-            if rule_type == "Persoon doet ALLE shows":
-                p1 = st.selectbox("Wie moet alles spelen?", df['Naam'].unique())
-                if st.button("Voeg Regel Toe"):
-                    regels.append({'type': 'must_all', 'p1': p1})
-                    st.session_state['regels'] = regels
-                    st.success(f"Regel: {p1} speelt alles.")
-
-            elif rule_type == "Persoon doet specifieke show":
-                p1 = st.selectbox("Wie?", df['Naam'].unique())
-                target_show = st.selectbox("Welke show?", shows)
-                if st.button("Voeg Regel Toe"):
-                    regels.append({'type': 'force_show', 'p1': p1, 'show': target_show})
-                    st.session_state['regels'] = regels
-                    st.success(f"Regel: {p1} doet {target_show}.")
-            
-            elif rule_type == "Minimaal aantal shows (Per Persoon)":
-                 p1 = st.selectbox("Wie?", df['Naam'].unique())
-                 max_shows_totaal = len(shows) 
-                 min_count = st.number_input("Minimum aantal shows", min_value=1, max_value=max_shows_totaal, value=1)
-                 if st.button("Voeg Regel Toe"):
-                    regels.append({'type': 'min_shows', 'p1': p1, 'count': min_count})
-                    st.session_state['regels'] = regels
-                    st.success(f"Regel: {p1} doet minimaal {min_count} shows.")
-
-            elif rule_type != "-": 
-                p1 = st.selectbox("Persoon 1", df['Naam'].unique())
-                p2 = st.selectbox("Persoon 2", df['Naam'].unique())
+
+        @st.fragment
+        def regels_paneel():
+            col1, col2 = st.columns([1, 2])
+
+            with col1:
+                st.subheader("Extra Regels")
+                rule_type = st.selectbox("Type regel", 
+                                         ["-", 
+                                          "Niet Samen (Conflict)", 
+                                          "Altijd Samen", 
+                                          "Persoon doet ALLE shows",
+                                          "Persoon doet specifieke show"])
+
+                regels = huidige_regels()
                 
-                if p1 != p2:
+                # --- Invoer velden afhankelijk van regel type ---
+                if rule_type == "Persoon doet ALLE shows":
+                    p1 = st.selectbox("Wie moet alles spelen?", df['Naam'].unique())
                     if st.button("Voeg Regel Toe"):
-                        type_code = 'conflict' if "Niet" in rule_type else 'samen'
-                        regels.append({'type': type_code, 'p1': p1, 'p2': p2})
+                        regels.append({'type': 'must_all', 'p1': p1})
                         st.session_state['regels'] = regels
-                        st.success("Regel toegevoegd!")
-                else:
-                    if p1 == p2 and rule_type != "-":
-                         st.warning("Kies twee verschillende personen.")
-
-        with col2:
-            if regels:
-                st.write("**Actieve Regels:**")
-                for i, r in enumerate(regels):
-                    c_txt, c_btn = st.columns([4, 1])
-                    with c_txt:
-                        if r['type'] == 'must_all': st.caption(f"🔒 **{r['p1']}** speelt alles")
-                        elif r['type'] == 'force_show': st.caption(f"📍 **{r['p1']}** doet {r['show']}")
-                        elif r['type'] == 'min_shows': st.caption(f"📉 **{r['p1']}** min. {r['count']} shows")
-                        elif r['type'] == 'conflict': st.caption(f"⚡ **{r['p1']}** & **{r['p2']}** NIET samen")
-                        elif r['type'] == 'samen': st.caption(f"🔗 **{r['p1']}** & **{r['p2']}** ALTIJD samen")
-                    with c_btn:
-                        if st.button("🗑️", key=f"del_{i}"):
-                            regels.pop(i)
-                            st.session_state['regels'] = regels
-                            st.rerun()
+                        st.success(f"Regel: {p1} speelt alles.")
+
+                elif rule_type == "Persoon doet specifieke show":
+                    p1 = st.selectbox("Wie?", df['Naam'].unique())
+                    target_show = st.selectbox("Welke show?", shows)
+                    if st.button("Voeg Regel Toe"):
+                        regels.append({'type': 'force_show', 'p1': p1, 'show': target_show})
+                        st.session_state['regels'] = regels
+                        st.success(f"Regel: {p1} doet {target_show}.")
                 
-                st.divider()
-                if st.button("Alles Wissen", type="secondary"):
-                    st.session_state['regels'] = []
-                    st.rerun()
+                elif rule_type == "Minimaal aantal shows (Per Persoon)":
+                     p1 = st.selectbox("Wie?", df['Naam'].unique())
+                     max_shows_totaal = len(shows) 
+                     min_count = st.number_input("Minimum aantal shows", min_value=1, max_value=max_shows_totaal, value=1)
+                     if st.button("Voeg Regel Toe"):
+                        regels.append({'type': 'min_shows', 'p1': p1, 'count': min_count})
+                        st.session_state['regels'] = regels
+                        st.success(f"Regel: {p1} doet minimaal {min_count} shows.")
+
+                elif rule_type != "-": 
+                    p1 = st.selectbox("Persoon 1", df['Naam'].unique())
+                    p2 = st.selectbox("Persoon 2", df['Naam'].unique())
+                    
+                    if p1 != p2:
+                        if st.button("Voeg Regel Toe"):
+                            type_code = 'conflict' if "Niet" in rule_type else 'samen'
+                            regels.append({'type': type_code, 'p1': p1, 'p2': p2})
+                            st.session_state['regels'] = regels
+                            st.success("Regel toegevoegd!")
+                    else:
+                        if p1 == p2 and rule_type != "-":
+                             st.warning("Kies twee verschillende personen.")
+
+            with col2:
+                if regels:
+                    st.write("**Actieve Regels:**")
+                    for i, r in enumerate(regels):
+                        c_txt, c_btn = st.columns([4, 1])
+                        with c_txt:
+                            if r['type'] == 'must_all': st.caption(f"🔒 **{r['p1']}** speelt alles")
+                            elif r['type'] == 'force_show': st.caption(f"📍 **{r['p1']}** doet {r['show']}")
+                            elif r['type'] == 'min_shows': st.caption(f"📉 **{r['p1']}** min. {r['count']} shows")
+                            elif r['type'] == 'conflict': st.caption(f"⚡ **{r['p1']}** & **{r['p2']}** NIET samen")
+                            elif r['type'] == 'samen': st.caption(f"🔗 **{r['p1']}** & **{r['p2']}** ALTIJD samen")
+                        with c_btn:
+                            st.button("🗑️", key=f"del_{i}", on_click=regels.pop, args=(i,))
+                    
+                    st.divider()
+                    st.button("Alles Wissen", type="secondary", on_click=regels.clear)
+
+            stop_verouderd(bestand_hash, instrumenten)
+
+        regels_paneel()
 
         # --- E. DE GROTE KNOP & RESULTAAT ---
         st.divider()
-        
-        # 1. Rekenwerk
+
+        limits = huidige_limieten(instrumenten)
+        regels = huidige_regels()
+        solver_opties = huidige_solver_opties()
+        time_limit = solver_opties['time_limit']
+        planner = sessie_planner(bestand_hash, df)
+        wachtrij = job_wachtrij()
+        sleutel_planning = planning_sleutel(bestand_hash, instrumenten)
+        stop_verouderd(bestand_hash, instrumenten)
+
+        # 1. Rekenwerk (in de achtergrond, zie jobs.py)
         if st.button("🚀 Genereer Planning", type="primary"):
-            with st.spinner("Puzzelen..."):
-                status, result = run_solver(df, limits, regels)
-                
-                # Opslaan in geheugen
-                st.session_state['oplossing_status'] = status
-                st.session_state['oplossing_df'] = result
-                
-                # Oude handmatige bewerkingen wissen bij nieuwe berekening
-                if 'bewerkte_df' in st.session_state:
-                    del st.session_state['bewerkte_df']
-                
+            if 'planning_job' in st.session_state:
+                wachtrij.annuleer(st.session_state.pop('planning_job'))
+            st.session_state.pop('planning_fout', None)
+            st.session_state.pop('planning_cache_sleutel', None)
+            opties = dict(solver_opties)
+            job_info = dict(sleutel=sleutel_planning, eigenaar=f"{sessie_id()}:planning", verwacht=time_limit)
+            begin = time.perf_counter()
+            cache_sleutel = invoer_hash(df, limits, regels, opties)
+            uit_cache = schijf_cache().haal_op(cache_sleutel)
+            if uit_cache is not None:
+                # Deze invoer is al eens opgelost (in welke sessie dan ook)
+                status, rooster = uit_cache
+                bewaar_uitkomst(status, rooster, stats_uit_cache(status, time.perf_counter() - begin, opties['backend']))
                 if status == "Optimal":
-                    st.balloons()
+                    st.session_state['ballonnen'] = True
+            else:
+                if opties['decompose'] or opties['venster']:
+                    job_id = wachtrij.dien_in(run_solver, df, limits, regels, stats=True, **job_info, **opties)
+                else:
+                    # Het model van deze sessie bijwerken (snel) en het oplossen uitbesteden.
+                    # De presolve (tegenstrijdigheden) doet los_model_op in de job; een
+                    # OnmogelijkeInvoer komt terug via verwerk_planning.
+                    planner.zet_limieten(limits)
+                    planner.zet_regels(regels)
+                    job_id = wachtrij.dien_in(los_planning_op, planner.model, **job_info,
+                                              **{k: v for k, v in opties.items() if k not in ('decompose', 'venster')})
+                st.session_state['planning_job'] = job_id
+                st.session_state['planning_cache_sleutel'] = cache_sleutel
+
+        if 'planning_job' in st.session_state:
+            volg_job(wachtrij, 'planning_job', verwerk_planning)
+        if 'planning_fout' in st.session_state:
+            st.error(f"Er ging iets mis tijdens het rekenen: {st.session_state['planning_fout']}")
+
+        # --- F. WAT ALS? (SCENARIO'S VERGELIJKEN) ---
+        @st.fragment
+        def wat_als():
+            with st.expander("🔀 Wat als? Vergelijk verschillende bezettingen"):
+                limits = huidige_limieten(instrumenten)
+                regels = huidige_regels()
+                solver_opties = huidige_solver_opties()
+                time_limit = solver_opties['time_limit']
+                sleutel_invoer = planning_sleutel(bestand_hash, instrumenten)[0]
+                st.write("Elke rij is een scenario met eigen maxima per instrument. Het model wordt één keer gebouwd; per scenario verandert alleen de bezetting.")
+                standaard_scenarios = pd.DataFrame([
+                    {"Scenario": "Huidig", **limits},
+                    {"Scenario": "Krapper", **{i: max(m - 1, 0) for i, m in limits.items()}},
+                    {"Scenario": "Ruimer", **{i: m + 1 for i, m in limits.items()}},
+                ])
+                scenario_df = st.data_editor(standaard_scenarios, num_rows="dynamic", hide_index=True,
+                                             key=f"scenarios_{bestand_hash}")
+                scenario_df = scenario_df.dropna(subset=['Scenario']).drop_duplicates('Scenario')
+                scenarios = {
+                    str(rij['Scenario']): {i: int(rij[i]) for i in limits if pd.notna(rij.get(i))}
+                    for _, rij in scenario_df.iterrows()
+                }
+                opties = {k: v for k, v in solver_opties.items() if k not in ('decompose', 'venster')}
+                sleutel_scenarios = (sleutel_invoer, tuple(opties.items()), json.dumps(scenarios, sort_keys=True))
+                if wachtrij.annuleer_verouderd(f"{sessie_id()}:scenarios", sleutel_scenarios):
+                    st.session_state.pop('scenario_job', None)
+
+                if st.button("🔀 Vergelijk scenario's", disabled=not scenarios):
+                    if 'scenario_job' in st.session_state:
+                        wachtrij.annuleer(st.session_state.pop('scenario_job'))
+                    for sleutel in ['scenario_tabel', 'scenario_fout']:
+                        st.session_state.pop(sleutel, None)
+                    st.session_state['scenario_job'] = wachtrij.dien_in(
+                        vergelijk_scenarios, df, scenarios, regels, sleutel=sleutel_scenarios,
+                        eigenaar=f"{sessie_id()}:scenarios", verwacht=time_limit * len(scenarios), **opties)
+
+                if 'scenario_job' in st.session_state:
+                    volg_job(wachtrij, 'scenario_job', verwerk_scenarios)
+                if 'scenario_fout' in st.session_state:
+                    st.error(f"Er ging iets mis tijdens het rekenen: {st.session_state['scenario_fout']}")
+                if 'scenario_tabel' in st.session_state:
+                    st.dataframe(st.session_state['scenario_tabel'], hide_index=True, use_container_width=True)
+
+        wat_als()
 
         # 2. Weergave
         if 'oplossing_df' in st.session_state:
             
             status = st.session_state['oplossing_status']
+            if st.session_state.pop('ballonnen', False):
+                st.balloons()
+
+            # --- REKENDETAILS ---
+            stats = st.session_state.get('oplossing_stats')
+            if stats is not None:
+                with st.expander("📊 Rekendetails"):
+                    m1, m2, m3, m4, m5 = st.columns(5)
+                    m1.metric("Variabelen", stats.variabelen)
+                    m2.metric("Constraints", stats.constraints)
+                    m3.metric("Nonzeros", stats.nonzeros)
+                    m4.metric("Nodes", "-" if stats.nodes is None else stats.nodes)
+                    m5.metric("Gap", "-" if stats.gap is None else f"{stats.gap:.2%}")
+                    fasen_df = pd.DataFrame({"Fase": list(stats.fasen), "Seconden": [round(s, 3) for s in stats.fasen.values()]})
+                    st.dataframe(fasen_df, hide_index=True, use_container_width=True)
+                    if stats.totaal is not None:
+                        st.caption(f"Totaal {stats.totaal:.2f} s met backend '{stats.backend}'. Bij opsplitsen zijn de fasetijden van alle groepen opgeteld.")
+                    if 'cache' in stats.fasen:
+                        st.caption("Deze planning is eerder met precies dezelfde invoer en instellingen gemaakt en komt uit de cache.")
+                    if stats.winnaars:
+                        st.caption("Solver-race gewonnen door: " + ", ".join(
+                            f"{naam} ({aantal}×)" if aantal > 1 else naam for naam, aantal in stats.winnaars.items()))
+                    if stats.samengevoegd:
+                        st.caption(f"{stats.samengevoegd} variabelen minder doordat uitwisselbare muzikanten (zelfde instrument en scores, geen wens of regels) per show als één aantal zijn opgelost.")
+                    stats.geheugen = sessie_geheugen()
+                    grootste = sorted(stats.geheugen.items(), key=lambda kv: -kv[1])[:3]
+                    st.caption(f"Deze sessie bewaart {sum(stats.geheugen.values()) / 1024:.0f} kB, vooral: "
+                               + ", ".join(f"{sleutel} ({grootte / 1024:.0f} kB)" for sleutel, grootte in grootste))
             
-            # --- HULPFUNCTIE VOOR EXCEL MAKEN ---
-            def maak_excel(dataframe, is_checkbox_data=False):
-                buffer = io.BytesIO()
-                export_df = dataframe.copy()
-                
-                if is_checkbox_data:
-                    bool_cols = [c for c in export_df.columns if export_df[c].dtype == bool]
-                    for col in bool_cols:
-                        export_df[col] = export_df[col].apply(lambda x: '✅' if x else '.')
-
-                with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-                    export_df.to_excel(writer, index=False, sheet_name='Rooster')
-                    
-                    workbook = writer.book
-                    worksheet = writer.sheets['Rooster']
-                    format_green = workbook.add_format({'bg_color': '#C6EFCE', 'font_color': '#006100', 'border': 1})
-                    format_center = workbook.add_format({'align': 'center'})
-                    
-                    worksheet.set_column('A:A', 20) 
-                    worksheet.set_column('B:B', 15)
-                    worksheet.set_column('C:Z', 12, format_center)
-                    
-                    worksheet.conditional_format('C2:Z100', {
-                        'type': 'cell', 'criteria': 'equal to', 'value': '"✅"', 'format': format_green
-                    })
-                buffer.seek(0)
-                return buffer
-
             # --- PREPARATIE EDITOR ---
-            if 'tabel_versie' not in st.session_state:
-                st.session_state['tabel_versie'] = 0
-
-            if 'bewerkte_df' not in st.session_state:
-                base_df = st.session_state['oplossing_df'].copy()
+            # In de sessie staan alleen Rooster objecten (bits); de tabel voor de
+            # editor wordt bij elke weergave opnieuw gemaakt
+            def naar_editor(rooster):
+                # Rooster -> tabel met vinkjes (bool) voor de editor
+                base_df = rooster.als_bool()
                 
                 volgorde_map = {naam: i for i, naam in enumerate(instrumenten)}
                 base_df['_sort_index'] = base_df['Instrument'].map(volgorde_map)
                 base_df = base_df.sort_values(by=['_sort_index', 'Naam'])
-                base_df = base_df.drop(columns=['_sort_index'])
+                return base_df.drop(columns=['_sort_index'])
 
-                for col in shows:
-                    base_df[col] = base_df[col].apply(lambda x: True if x == '✅' else False)
-                
-                st.session_state['bewerkte_df'] = base_df
+            if 'tabel_versie' not in st.session_state:
+                st.session_state['tabel_versie'] = 0
 
-            df_to_show = st.session_state['bewerkte_df']
+            if 'bewerkte_df' not in st.session_state and status in OPLOSSING_GEVONDEN:
+                # Nog niets bewerkt: zelfde object als het origineel
+                st.session_state['bewerkte_df'] = st.session_state['oplossing_df']
 
-            if status == "Optimal":
-                
-                # HEADER MET KNOPPEN
-                c1, c2, c3 = st.columns([2, 1, 1])
-                with c1: st.subheader("Het Resultaat")
-                with c2: 
-                    st.write("") 
-                    buffer_orig = maak_excel(st.session_state['oplossing_df'], is_checkbox_data=False)
-                    st.download_button("📥 Origineel", buffer_orig, "Rooster_Origineel.xlsx", use_container_width=True)
-                with c3:
-                    st.write("") 
-                    def reset_alles():
-                        if 'bewerkte_df' in st.session_state: del st.session_state['bewerkte_df']
-                        st.session_state['tabel_versie'] += 1
-                    st.button("🔄 Reset Wijzigingen", type="secondary", use_container_width=True, on_click=reset_alles)
-
-                st.info("💡 **Batch Mode:** Je kunt hieronder het rooster aanpassen. Klik op **'Opslaan'** om te controleren.")
-
-                column_config = {
-                    "Naam": st.column_config.TextColumn(disabled=True),
-                    "Instrument": st.column_config.TextColumn(disabled=True),
-                    "Totaal": st.column_config.NumberColumn(disabled=True)
-                }
-                for s in shows:
-                    column_config[s] = st.column_config.CheckboxColumn(s, default=False)
-
-                # FORMULIER
-                with st.form("rooster_form"):
-                    current_key = f"editor_{st.session_state['tabel_versie']}"
-                    edited_df = st.data_editor(
-                        df_to_show, use_container_width=True, height=600,
-                        key=current_key, column_config=column_config, hide_index=True
-                    )
-                    st.write("")
-                    submit_btn = st.form_submit_button("💾 Wijzigingen Controleren & Opslaan", type="primary")
-
-                # LOGICA NA OPSLAAN
-                if submit_btn:
-                    st.session_state['bewerkte_df'] = edited_df
-                    fouten_log = [] 
-                    
-                    # --- CHECK 1: LIMIETEN (Capaciteit) ---
-                    for show in shows:
-                        for instr, max_aantal in limits.items():
-                            if max_aantal > 0:
-                                df_instr = edited_df[edited_df['Instrument'] == instr]
-                                count = df_instr[show].sum()
-                                if count > max_aantal:
-                                    fouten_log.append(f"⚠️ **Capaciteit:** Bij {show} zitten er **{count}** {instr}s (Max = {max_aantal}).")
-
-                    # --- CHECK 2: FYSIEKE ONMOGELIJKHEID (De Octopus Check 🐙) ---
-                    # We kijken per persoon of hij/zij meer dan 1 vinkje heeft per show
-                    unieke_namen = edited_df['Naam'].unique()
-                    for naam in unieke_namen:
-                        persoon_rows = edited_df[edited_df['Naam'] == naam]
-                        for s in shows:
-                            # Tel hoeveel vinkjes deze persoon in deze show heeft staan
-                            aantal_instrumenten = persoon_rows[s].sum()
-                            
-                            if aantal_instrumenten > 1:
-                                # We zoeken even op welke instrumenten het zijn voor de duidelijkheid
-                                welke_instr = persoon_rows[persoon_rows[s]]['Instrument'].tolist()
-                                welke_str = " en ".join(welke_instr)
-                                fouten_log.append(f"🐙 **Onmogelijk:** {naam} speelt in {s} op **{aantal_instrumenten}** instrumenten tegelijk ({welke_str}).")
-
-                    # --- CHECK 3: REGELS (User Defined) ---
-                    for r in regels:
-                        try:
-                            p1_rows = edited_df[edited_df['Naam'] == r.get('p1')]
-                            
-                            if r['type'] == 'conflict':
-                                p2_rows = edited_df[edited_df['Naam'] == r.get('p2')]
-                                # Heeft P1 ergens een vinkje? EN P2 ook?
-                                p1_active = p1_rows[shows].any(axis=0)
-                                p2_active = p2_rows[shows].any(axis=0)
-                                if (p1_active & p2_active).any():
-                                    fouten_log.append(f"⚡ Conflict: {r['p1']} & {r['p2']} samen ingedeeld.")
-
-                            elif r['type'] == 'samen':
-                                p2_rows = edited_df[edited_df['Naam'] == r.get('p2')]
-                                p1_active = p1_rows[shows].any(axis=0)
-                                p2_active = p2_rows[shows].any(axis=0)
-                                if not p1_active.equals(p2_active):
-                                    fouten_log.append(f"🔗 Samen: {r['p1']} en {r['p2']} lopen niet gelijk.")
-
-                            elif r['type'] == 'must_all':
-                                p1_active_per_show = p1_rows[shows].any(axis=0)
-                                if not p1_active_per_show.all():
-                                    missing_shows = p1_active_per_show[~p1_active_per_show].index.tolist()
-                                    fouten_log.append(f"🔒 **Verplicht:** {r['p1']} mist: {', '.join(missing_shows)}")
-
-                            elif r['type'] == 'force_show':
-                                target = r['show']
-                                if not p1_rows[target].any():
-                                     fouten_log.append(f"📍 **Verplicht:** {r['p1']} mist in {target}.")
-
-                            elif r['type'] == 'min_shows':
-                                count = p1_rows[shows].sum().sum()
-                                if count < r['count']:
-                                    fouten_log.append(f"📉 **Minimum:** {r['p1']} heeft {count} shows (min {r['count']}).")
-                        except Exception as e:
-                            pass
-
-                    # RESULTAAT TONEN
-                    if fouten_log:
-                        st.error("🛑 **Let op! Regels overtreden:**")
-                        for f in fouten_log: st.write(f)
-                    else:
-                        st.success("✅ Alles opgeslagen! Regels en limieten zijn in orde.")
+            if status in OPLOSSING_GEVONDEN:
+                @st.fragment
+                def resultaat_editor():
+                    limits = huidige_limieten(instrumenten)
+                    regels = huidige_regels()
+                    solver_opties = huidige_solver_opties()
+                    df_to_show = naar_editor(st.session_state['bewerkte_df'])
 
-                    st.divider()
-                    c_h, c_b = st.columns([3, 1])
-                    with c_h: st.subheader("Aangepaste Versie")
-                    with c_b:
-                         st.write("")
-                         buffer_edit = maak_excel(edited_df, is_checkbox_data=True)
-                         st.download_button("📥 Download Aangepast", buffer_edit, "Rooster_Aangepast.xlsx")
+                    if status == "Feasible":
+                        st.warning("⏱️ De tijdslimiet is bereikt. Dit is het beste rooster dat gevonden is, maar het is niet bewezen optimaal.")
+                    
+                    # HEADER MET KNOPPEN
+                    c1, c2, c3 = st.columns([2, 1, 1])
+                    with c1: st.subheader("Het Resultaat")
+                    with c2: 
+                        st.write("") 
+                        buffer_orig = excel_bestand(st.session_state['oplossing_df'])
+                        st.download_button("📥 Origineel", buffer_orig, "Rooster_Origineel.xlsx", use_container_width=True)
+                    with c3:
+                        st.write("") 
+                        def reset_alles():
+                            stop_reparatie()
+                            for sleutel in ['fouten_log', 'reparatie_diff']:
+                                if sleutel in st.session_state: del st.session_state[sleutel]
+                            # Niet wissen maar terugzetten: alleen dit fragment draait hierna opnieuw
+                            st.session_state['bewerkte_df'] = st.session_state['oplossing_df']
+                            st.session_state['tabel_versie'] += 1
+                        st.button("🔄 Reset Wijzigingen", type="secondary", use_container_width=True, on_click=reset_alles)
+
+                    st.info("💡 **Batch Mode:** Je kunt hieronder het rooster aanpassen. Klik op **'Opslaan'** om te controleren.")
+
+                    column_config = {
+                        "Naam": st.column_config.TextColumn(disabled=True),
+                        "Instrument": st.column_config.TextColumn(disabled=True),
+                        "Totaal": st.column_config.NumberColumn(disabled=True)
+                    }
+                    for s in shows:
+                        column_config[s] = st.column_config.CheckboxColumn(s, default=False)
+
+                    # FORMULIER
+                    with st.form("rooster_form"):
+                        current_key = f"editor_{st.session_state['tabel_versie']}"
+                        edited_df = st.data_editor(
+                            df_to_show, use_container_width=True, height=600,
+                            key=current_key, column_config=column_config, hide_index=True
+                        )
+                        st.write("")
+                        submit_btn = st.form_submit_button("💾 Wijzigingen Controleren & Opslaan", type="primary")
+
+                    # LOGICA NA OPSLAAN
+                    if submit_btn:
+                        stop_reparatie()
+                        st.session_state['bewerkte_df'] = st.session_state['oplossing_df'].met_vinkjes(edited_df)
+                        fouten_log = validate_schedule(edited_df, limits, regels, df, shows)
+
+                        st.session_state['fouten_log'] = fouten_log
+
+                        # RESULTAAT TONEN
+                        if fouten_log:
+                            st.error("🛑 **Let op! Regels overtreden:**")
+                            for f in fouten_log: st.write(f)
+                        else:
+                            st.success("✅ Alles opgeslagen! Regels en limieten zijn in orde.")
+
+                        st.divider()
+                        c_h, c_b = st.columns([3, 1])
+                        with c_h: st.subheader("Aangepaste Versie")
+                        with c_b:
+                             st.write("")
+                             buffer_edit = excel_bestand(edited_df)
+                             st.download_button("📥 Download Aangepast", buffer_edit, "Rooster_Aangepast.xlsx")
+
+                    # --- REPARATIE (dichtstbijzijnde geldige rooster) ---
+                    if st.session_state.get('fouten_log'):
+                        st.write("Laat de planner het rooster repareren: jouw aanpassingen blijven zoveel mogelijk staan, alleen wat nodig is wordt gewijzigd.")
+                        if st.button("🛠️ Repareer Rooster", type="primary"):
+                            # Net als de planning in de achtergrond (zie jobs.py)
+                            stop_reparatie()
+                            voor_df = st.session_state['bewerkte_df']
+                            job_info = dict(sleutel=(planning_sleutel(bestand_hash, instrumenten), 'reparatie',
+                                                     hashlib.sha256(voor_df.bits.tobytes()).hexdigest()),
+                                            eigenaar=f"{sessie_id()}:reparatie", verwacht=solver_opties['time_limit'])
+                            if solver_opties['decompose'] or solver_opties['venster']:
+                                job_id = wachtrij.dien_in(run_solver, df, limits, regels, start=voor_df, stats=True,
+                                                          **job_info, **solver_opties)
+                            else:
+                                # Het model van de sessie wordt hergebruikt, alleen de doelfunctie wijzigt
+                                planner.zet_limieten(limits)
+                                planner.zet_regels(regels)
+                                opties = {k: v for k, v in solver_opties.items() if k not in ('decompose', 'venster')}
+                                job_id = wachtrij.dien_in(los_planning_op, planner.model, start=voor_df,
+                                                          **job_info, **opties)
+                            st.session_state['reparatie_job'] = job_id
+                            st.session_state['reparatie_start'] = voor_df
+
+                        if 'reparatie_job' in st.session_state:
+                            volg_job(wachtrij, 'reparatie_job', verwerk_reparatie)
+                        if 'reparatie_fout' in st.session_state:
+                            st.error(f"Er ging iets mis tijdens het repareren: {st.session_state['reparatie_fout']}")
+                        if 'reparatie_mislukt' in st.session_state:
+                            for melding in st.session_state['reparatie_mislukt']: st.write(f"🚫 {melding}")
+                            st.error("Ook met aanpassingen is er geen geldig rooster te vinden. Misschien zijn je regels te streng?")
+
+                    if 'reparatie_diff' in st.session_state:
+                        diff_df = st.session_state['reparatie_diff']
+                        if diff_df.empty:
+                            st.success("🛠️ Reparatie klaar: er hoefde niets te veranderen.")
+                        else:
+                            st.success(f"🛠️ Reparatie klaar: {len(diff_df)} vakje(s) aangepast.")
+                            st.dataframe(diff_df, use_container_width=True, hide_index=True)
+
+                resultaat_editor()
 
                 # =========================================================
                 # 📧 MAIL MERGE BESTAND GENEREREN (NIEUW!)
                 # =========================================================
-                st.divider()
-                st.subheader("📧 E-mailen naar muzikanten")
-                
-                # Check of er een e-mail kolom is
-                email_cols = [c for c in df.columns if 'mail' in c.lower()]
-                
-                if not email_cols:
-                    st.info("💡 Tip: Als je in je Excel een kolom 'Email' toevoegt, kan ik een verzendlijst maken.")
-                else:
-                    st.write("Download hier een lijst die klaar is voor **Word Afdruk Samenvoegen**.")
-                    email_col = email_cols[0]
+                @st.fragment
+                def verzendlijst():
+                    st.divider()
+                    st.subheader("📧 E-mailen naar muzikanten")
+                    
+                    # Check of er een e-mail kolom is
+                    email_cols = [c for c in df.columns if 'mail' in c.lower()]
                     
-                    if st.button("Genereer Verzendlijst"):
-                        mailing_data = []
-                        huidige_df = st.session_state['bewerkte_df']
-                        unieke_namen = huidige_df['Naam'].unique()
+                    if not email_cols:
+                        st.info("💡 Tip: Als je in je Excel een kolom 'Email' toevoegt, kan ik een verzendlijst maken.")
+                    else:
+                        st.write("Download hier een lijst die klaar is voor **Word Afdruk Samenvoegen**.")
+                        email_col = email_cols[0]
                         
-                        for naam in unieke_namen:
-                            persoons_rijen = huidige_df[huidige_df['Naam'] == naam]
-                            # Mailadres ophalen uit originele DF
-                            try:
-                                email_adres = df[df['Naam'] == naam][email_col].iloc[0]
-                            except:
-                                email_adres = "Onbekend"
+                        if st.button("Genereer Verzendlijst"):
+                            mailing_data = []
+                            huidige_df = st.session_state['bewerkte_df'].als_bool()
+                            unieke_namen = huidige_df['Naam'].unique()
                             
-                            instrumenten_str = ", ".join(persoons_rijen['Instrument'].unique())
+                            for naam in unieke_namen:
+                                persoons_rijen = huidige_df[huidige_df['Naam'] == naam]
+                                # Mailadres ophalen uit originele DF
+                                try:
+                                    email_adres = df[df['Naam'] == naam][email_col].iloc[0]
+                                except:
+                                    email_adres = "Onbekend"
+                                
+                                instrumenten_str = ", ".join(persoons_rijen['Instrument'].unique())
+                                
+                                # Shows verzamelen
+                                shows_te_spelen = []
+                                for s in shows:
+                                    if persoons_rijen[s].any(): shows_te_spelen.append(s)
+                                
+                                mailing_data.append({
+                                    "Naam": naam,
+                                    "Email": email_adres,
+                                    "Instrument": instrumenten_str,
+                                    "Rooster": ", ".join(shows_te_spelen) if shows_te_spelen else "Geen shows"
+                                })
                             
-                            # Shows verzamelen
-                            shows_te_spelen = []
-                            for s in shows:
-                                if persoons_rijen[s].any(): shows_te_spelen.append(s)
+                            mail_df = pd.DataFrame(mailing_data)
+                            buffer_mail = io.BytesIO()
+                            with pd.ExcelWriter(buffer_mail, engine='xlsxwriter') as writer:
+                                mail_df.to_excel(writer, index=False)
+                            buffer_mail.seek(0)
                             
-                            mailing_data.append({
-                                "Naam": naam,
-                                "Email": email_adres,
-                                "Instrument": instrumenten_str,
-                                "Rooster": ", ".join(shows_te_spelen) if shows_te_spelen else "Geen shows"
-                            })
-                        
-                        mail_df = pd.DataFrame(mailing_data)
-                        buffer_mail = io.BytesIO()
-                        with pd.ExcelWriter(buffer_mail, engine='xlsxwriter') as writer:
-                            mail_df.to_excel(writer, index=False)
-                        buffer_mail.seek(0)
-                        
-                        st.download_button("📥 Download Verzendlijst", buffer_mail, "Verzendlijst.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+                            st.download_button("📥 Download Verzendlijst", buffer_mail, "Verzendlijst.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+                verzendlijst()
+            elif status == "Not Solved":
+                st.error("Binnen de tijdslimiet is geen rooster gevonden. Geef de solver meer tijd of versoepel je regels.")
             else:
-                st.error("Kon geen oplossing vinden. Misschien zijn je regels te streng?")
\ No newline at end of file
+                st.error("Kon geen oplossing vinden. Misschien zijn je regels te streng?")
+                if 'tegenstrijdig' in st.session_state:
+                    st.write("Dit kan nooit kloppen (een 0 in de Excel betekent: kan niet):")
+                    for melding in st.session_state['tegenstrijdig']: st.write(f"🚫 {melding}")
+
+                # --- DIAGNOSE (welke regels/wensen/limieten moeten wijken?) ---
+                @st.fragment
+                def diagnose_paneel():
+                    limits = huidige_limieten(instrumenten)
+                    regels = huidige_regels()
+                    solver_opties = huidige_solver_opties()
+                    sleutel_planning = planning_sleutel(bestand_hash, instrumenten)
+                    st.write("Laat de planner uitzoeken wat er minimaal moet wijken: in één berekening, in plaats van regels één voor één weg te halen.")
+                    if st.button("🩺 Wat botst er?") and 'diagnose_job' not in st.session_state:
+                        st.session_state.pop('diagnose_fout', None)
+                        planner.zet_limieten(limits)
+                        planner.zet_regels(regels)
+                        opties = {k: v for k, v in solver_opties.items() if k not in ('decompose', 'venster')}
+                        st.session_state['diagnose_job'] = wachtrij.dien_in(
+                            diagnoseer, planner.model, sleutel=(sleutel_planning, 'diagnose'),
+                            eigenaar=f"{sessie_id()}:diagnose", verwacht=solver_opties['time_limit'], **opties)
+
+                    if 'diagnose_job' in st.session_state:
+                        volg_job(wachtrij, 'diagnose_job', verwerk_diagnose)
+                    if 'diagnose_fout' in st.session_state:
+                        st.error(f"Er ging iets mis tijdens het rekenen: {st.session_state['diagnose_fout']}")
+                    if 'diagnose' in st.session_state:
+                        d_status, d_tabel = st.session_state['diagnose']
+                        if d_status not in OPLOSSING_GEVONDEN:
+                            st.warning("Ook de diagnose kwam niet binnen de tijdslimiet tot een antwoord. Geef de solver meer tijd.")
+                        elif d_tabel.empty:
+                            st.info("Er hoeft niets te wijken: met meer rekentijd is er waarschijnlijk gewoon een rooster.")
+                        else:
+                            st.write("Met deze aanpassingen is er wél een rooster mogelijk:")
+                            st.dataframe(d_tabel.drop(columns=['Groep']), hide_index=True, use_container_width=True)
+                            if d_status == "Feasible":
+                                st.caption("Tijdslimiet bereikt: dit is genoeg, maar misschien kan het met nog minder aanpassingen.")
+
+                diagnose_paneel()
\ No newline at end of file
@@ -0,0 +1,164 @@
+import argparse
+import csv
+import io
+import json
+import platform
+import time
+from datetime import datetime
+
+import numpy as np
+import pulp
+
+import ingest
+from solver import bouw_model, los_model_op, OnmogelijkeInvoer, SolveStats
+
+# Kans op 3 / 2 / 1 / 0 / leeg in het formulier
+STANDAARD_VERDELING = (0.35, 0.25, 0.10, 0.15, 0.15)
+KOLOMMEN = ['musici', 'instrumenten', 'shows', 'multi', 'regels', 'resources',
+            'variabelen', 'rijen', 'nonzeros', 'status', 'inlezen_s', 'bouwen_s',
+            'vertalen_s', 'oplossen_s', 'uitlezen_s', 'totaal_s']
+# Fasen uit SolveStats per kolom; de rest (controleren, symmetrie, oplossen) telt als oplossen_s.
+# uitlezen_s: de waarden uit de solver halen (PuLP: varValue per variabele) plus het rooster maken
+FASE_KOLOMMEN = {'voorbereiden': 'bouwen_s', 'model bouwen': 'bouwen_s', 'vertalen': 'vertalen_s',
+                 'waarden ophalen': 'uitlezen_s', 'uitlezen': 'uitlezen_s'}
+
+
+# 1. ROOSTER GENEREREN
+def genereer_rooster(musici=100, instrumenten=5, shows=10, multi=0.15, regel_dichtheid=0.02,
+                     verdeling=STANDAARD_VERDELING, seed=0):
+    # Zelfde vorm als een ingevuld sjabloon (Naam/Instrument/Wens/shows), met
+    # willekeurige scores. Geeft (ruw rooster, limieten, regels) terug.
+    rng = np.random.default_rng(seed)
+    namen_instr = [f"Instrument {k+1}" for k in range(instrumenten)]
+    aantallen = rng.multinomial(musici, [1 / instrumenten] * instrumenten)
+    df = ingest.maak_sjabloon(zip(namen_instr, aantallen), shows)
+    df['Naam'] = [f"Muzikant {i+1}" for i in range(len(df))]
+
+    # Multi-instrumentalisten: een tweede instrument erbij, zoals "Viool 1, Altviool"
+    tweede = rng.choice(namen_instr, size=len(df))
+    extra = (rng.random(len(df)) < multi) & (tweede != df['Instrument'])
+    df.loc[extra, 'Instrument'] = df.loc[extra, 'Instrument'] + ", " + tweede[extra]
+
+    # Wens bij ongeveer de helft, tot een derde van de shows
+    wens = rng.integers(1, max(2, shows // 3) + 1, size=len(df))
+    df['Wens'] = np.where(rng.random(len(df)) < 0.5, wens.astype(str), "-")
+
+    show_cols = [f"Show {i+1}" for i in range(shows)]
+    scores = rng.choice(["3", "2", "1", "0", "-"], size=(len(df), shows), p=verdeling)
+    df[show_cols] = scores
+
+    # Ruim genoeg plek per show voor de gemiddelde wens
+    limits = {instr: max(1, int(np.ceil(n * 0.6))) for instr, n in zip(namen_instr, aantallen)}
+
+    regels = []
+    namen = df['Naam'].tolist()
+    for _ in range(int(round(regel_dichtheid * len(df)))):
+        p1, p2 = map(str, rng.choice(namen, size=2, replace=False))
+        soort = rng.integers(3)
+        if soort == 0:
+            regels.append({'type': 'conflict', 'p1': p1, 'p2': p2})
+        elif soort == 1:
+            regels.append({'type': 'min_shows', 'p1': p1, 'count': 1})
+        else:
+            # Alleen een show waar p1 niet expliciet "kan niet" (0) heeft ingevuld
+            rij = scores[namen.index(p1)]
+            kan = [s for s, v in zip(show_cols, rij) if v in ("3", "2", "1")]
+            if kan:
+                regels.append({'type': 'force_show', 'p1': p1, 'show': kan[rng.integers(len(kan))]})
+    return df, limits, regels
+
+
+# 2. METEN
+def meet(ruw, limits, regels, backend='pulp', **opties):
+    # Tijd per fase: inlezen (xlsx-bytes -> schoon df), model bouwen, vertalen naar de
+    # solver (PuLP/CSR), oplossen, waarden en rooster uitlezen. Alles behalve inlezen komt uit
+    # SolveStats, zoals run_solver het meet; de grootte ook, zonder extra werk.
+    buffer = io.BytesIO()
+    ruw.to_excel(buffer, index=False)
+    inhoud = buffer.getvalue()
+
+    t0 = time.perf_counter()
+    df = ingest.lees_rooster(inhoud, 'benchmark.xlsx')
+    t1 = time.perf_counter()
+    stats = SolveStats(backend)
+    model = bouw_model(df, limits, regels, stats=stats)
+    try:
+        status, _ = los_model_op(model, backend, stats=stats, **opties)
+    except OnmogelijkeInvoer:
+        status = "Infeasible"
+    t2 = time.perf_counter()
+
+    tijden = dict.fromkeys(['bouwen_s', 'vertalen_s', 'oplossen_s', 'uitlezen_s'], 0.0)
+    for fase, seconden in stats.fasen.items():
+        tijden[FASE_KOLOMMEN.get(fase, 'oplossen_s')] += seconden
+    return {
+        'resources': len(model.index), 'variabelen': stats.variabelen,
+        'rijen': stats.constraints, 'nonzeros': stats.nonzeros, 'status': status,
+        'inlezen_s': round(t1 - t0, 4), **{k: round(s, 4) for k, s in tijden.items()},
+        'totaal_s': round(t2 - t0, 4),
+    }
+
+
+def sweep(musici_reeks, instrumenten=5, shows=10, multi=0.15, regel_dichtheid=0.02,
+          verdeling=STANDAARD_VERDELING, herhalingen=1, seed=0, backend='pulp', **opties):
+    resultaten = []
+    for musici in musici_reeks:
+        for h in range(herhalingen):
+            ruw, limits, regels = genereer_rooster(musici, instrumenten, shows, multi,
+                                                   regel_dichtheid, verdeling, seed + h)
+            rij = {'musici': musici, 'instrumenten': instrumenten, 'shows': shows,
+                   'multi': multi, 'regels': len(regels)}
+            rij.update(meet(ruw, limits, regels, backend, **opties))
+            print(", ".join(f"{k}={rij[k]}" for k in KOLOMMEN))
+            resultaten.append(rij)
+    return resultaten
+
+
+# 3. WEGSCHRIJVEN
+def schrijf(resultaten, uit, instellingen):
+    meta = {
+        'datum': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pulp': pulp.__version__,
+        'machine': platform.machine(),
+        'instellingen': instellingen,
+    }
+    with open(f"{uit}.json", 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'resultaten': resultaten}, f, indent=2)
+    with open(f"{uit}.csv", 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=KOLOMMEN)
+        writer.writeheader()
+        writer.writerows(resultaten)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Meet hoe run_solver schaalt met de grootte van het rooster.")
+    parser.add_argument('--musici', type=int, nargs='+', default=[50, 100, 200, 400])
+    parser.add_argument('--instrumenten', type=int, default=5)
+    parser.add_argument('--shows', type=int, default=10)
+    parser.add_argument('--multi', type=float, default=0.15, help="fractie multi-instrumentalisten")
+    parser.add_argument('--regels', type=float, default=0.02, help="aantal regels per muzikant")
+    parser.add_argument('--verdeling', default=",".join(map(str, STANDAARD_VERDELING)),
+                        help="kans op 3,2,1,0,leeg (komma gescheiden)")
+    parser.add_argument('--herhalingen', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--backend', default='pulp')
+    parser.add_argument('--time-limit', type=float, default=None)
+    parser.add_argument('--gap', type=float, default=None)
+    parser.add_argument('--threads', type=int, default=None)
+    parser.add_argument('--zonder-symmetrie', action='store_true', help="uitwisselbare muzikanten niet samenvoegen")
+    parser.add_argument('--uit', default='benchmark_resultaten', help="bestandsnaam zonder .json/.csv")
+    args = parser.parse_args()
+
+    verdeling = [float(p) for p in args.verdeling.split(',')]
+    verdeling = tuple(np.array(verdeling) / sum(verdeling))
+    resultaten = sweep(args.musici, args.instrumenten, args.shows, args.multi, args.regels,
+                       verdeling, args.herhalingen, args.seed, args.backend,
+                       time_limit=args.time_limit, gap=args.gap, threads=args.threads,
+                       symmetrie=not args.zonder_symmetrie)
+    schrijf(resultaten, args.uit, vars(args))
+    print(f"Resultaten weggeschreven naar {args.uit}.json en {args.uit}.csv")
+
+
+if __name__ == "__main__":
+    main()
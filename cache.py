@@ -0,0 +1,163 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from solver import run_solver, Rooster, SolveStats
+
+logger = logging.getLogger(__name__)
+
+# Standaardplek en -grootte; per server aan te passen met FLORE_CACHE en FLORE_CACHE_MB
+STANDAARD_PAD = os.path.join(tempfile.gettempdir(), "flore_oplossingen.sqlite")
+STANDAARD_MB = 256
+
+# Opties die de uitkomst niet veranderen en dus niet in de sleutel horen
+NIET_IN_SLEUTEL = ('workers', 'stats')
+
+
+def invoer_hash(df, limits_per_instrument, extra_regels, opties=None):
+    # Zelfde schoongemaakte invoer, limieten, regels en solveropties = zelfde sleutel.
+    # Volgorde van de regels en van de limieten doet er niet toe.
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    h.update("\x1f".join(f"{k}:{t}" for k, t in df.dtypes.astype(str).items()).encode())
+    regels = sorted(json.dumps(regel, sort_keys=True, default=str) for regel in extra_regels)
+    opties = {k: v for k, v in (opties or {}).items() if k not in NIET_IN_SLEUTEL}
+    for deel in (limits_per_instrument, regels, opties):
+        h.update(b"\x1e" + json.dumps(deel, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+class SolveCache:
+    # Uitkomsten op schijf (SQLite), gedeeld door alle sessies en Streamlit processen.
+    # Per sleutel de status en het rooster als bits; is het bestand groter dan
+    # max_bytes, dan gaan de minst recent gebruikte uitkomsten eruit.
+    # Elke aanroep opent een eigen verbinding (veilig over threads en processen heen);
+    # WAL laat lezers doorgaan terwijl een ander proces schrijft. Gaat er iets mis met
+    # het bestand, dan wordt er gewoon gerekend: de cache is nooit verplicht.
+
+    def __init__(self, pad=None, max_bytes=None):
+        self.pad = pad or os.environ.get("FLORE_CACHE", STANDAARD_PAD)
+        self.max_bytes = max_bytes or int(os.environ.get("FLORE_CACHE_MB", STANDAARD_MB)) * 1024 * 1024
+        with self._verbinding() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""CREATE TABLE IF NOT EXISTS oplossingen (
+                              sleutel TEXT PRIMARY KEY,
+                              status TEXT NOT NULL,
+                              labels BLOB NOT NULL,
+                              bits BLOB NOT NULL,
+                              grootte INTEGER NOT NULL,
+                              gebruikt REAL NOT NULL)""")
+            db.execute("CREATE INDEX IF NOT EXISTS op_gebruik ON oplossingen (gebruikt)")
+
+    def _verbinding(self):
+        map_pad = os.path.dirname(os.path.abspath(self.pad))
+        os.makedirs(map_pad, exist_ok=True)
+        # isolation_level=None: zelf BEGIN IMMEDIATE doen bij schrijven
+        return _Verbinding(sqlite3.connect(self.pad, timeout=30, isolation_level=None))
+
+    # --- Publiek ---
+    def haal_op(self, sleutel):
+        # (status, Rooster) of None. Een onleesbare uitkomst telt als niet gevonden.
+        try:
+            with self._verbinding() as db:
+                rij = db.execute("SELECT status, labels, bits FROM oplossingen WHERE sleutel = ?",
+                                 (sleutel,)).fetchone()
+                if rij is None:
+                    return None
+                db.execute("UPDATE oplossingen SET gebruikt = ? WHERE sleutel = ?", (time.time(), sleutel))
+            status, labels, bits = rij
+            namen, instrumenten, momenten = json.loads(zlib.decompress(labels))
+            # Breedte uit het aantal shows, niet uit de bits: een leeg rooster ("Infeasible") heeft 0 rijen
+            breedte = (len(momenten) + 7) // 8
+            ingezet = np.unpackbits(np.frombuffer(bits, dtype=np.uint8).reshape(len(namen), breedte),
+                                    axis=1, count=len(momenten)).view(bool)
+            return status, Rooster(namen, instrumenten, momenten, ingezet)
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            logger.warning("cache %s niet te lezen: %s", self.pad, e)
+            return None
+
+    def bewaar(self, sleutel, status, rooster):
+        labels = zlib.compress(json.dumps([rooster.namen, rooster.instrumenten, rooster.momenten]).encode())
+        bits = rooster.bits.tobytes()
+        grootte = len(labels) + len(bits) + len(sleutel) + len(status)
+        try:
+            with self._verbinding() as db:
+                db.execute("BEGIN IMMEDIATE")
+                db.execute("INSERT OR REPLACE INTO oplossingen VALUES (?, ?, ?, ?, ?, ?)",
+                           (sleutel, status, labels, bits, grootte, time.time()))
+                self._ruim_op(db)
+                db.execute("COMMIT")
+        except sqlite3.Error as e:
+            logger.warning("cache %s niet te schrijven: %s", self.pad, e)
+
+    def grootte(self):
+        with self._verbinding() as db:
+            aantal, totaal = db.execute("SELECT COUNT(*), COALESCE(SUM(grootte), 0) FROM oplossingen").fetchone()
+        return aantal, totaal
+
+    # --- Intern ---
+    def _ruim_op(self, db):
+        # Binnen de schrijftransactie: minst recent gebruikt eruit tot het weer past
+        totaal = db.execute("SELECT COALESCE(SUM(grootte), 0) FROM oplossingen").fetchone()[0]
+        if totaal <= self.max_bytes:
+            return
+        weg = []
+        for sleutel, grootte in db.execute("SELECT sleutel, grootte FROM oplossingen ORDER BY gebruikt"):
+            if totaal <= self.max_bytes:
+                break
+            weg.append((sleutel,))
+            totaal -= grootte
+        db.executemany("DELETE FROM oplossingen WHERE sleutel = ?", weg)
+
+
+class _Verbinding:
+    # sqlite3 sluit een verbinding niet zelf af na een with-blok; dit wel
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self.db
+
+    def __exit__(self, soort, fout, spoor):
+        if fout is not None and self.db.in_transaction:
+            self.db.execute("ROLLBACK")
+        self.db.close()
+
+
+def stats_uit_cache(status, seconden, backend='pulp'):
+    # Rekendetails voor een uitkomst die uit de cache kwam: alleen de opzoektijd
+    meting = SolveStats(backend)
+    meting.status = status
+    meting.fasen['cache'] = meting.totaal = seconden
+    meting.log()
+    return meting
+
+
+def run_solver_met_cache(cache, df, limits_per_instrument, extra_regels, stats=False, **opties):
+    # run_solver met de cache ervoor. Reparaties (start) gaan altijd langs de solver;
+    # een uitkomst zonder rooster (bv. "Not Solved" door de tijdslimiet) wordt niet bewaard.
+    if cache is None or opties.get('start') is not None:
+        return run_solver(df, limits_per_instrument, extra_regels, stats=stats, **opties)
+
+    begin = time.perf_counter()
+    sleutel = invoer_hash(df, limits_per_instrument, extra_regels, opties)
+    uitkomst = cache.haal_op(sleutel)
+    if uitkomst is not None:
+        status, rooster = uitkomst
+        if not stats:
+            return status, rooster
+        return status, rooster, stats_uit_cache(status, time.perf_counter() - begin, opties.get('backend', 'pulp'))
+
+    uitkomst = run_solver(df, limits_per_instrument, extra_regels, stats=stats, **opties)
+    status, rooster = uitkomst[:2]
+    if status in ("Optimal", "Feasible", "Infeasible"):
+        cache.bewaar(sleutel, status, rooster)
+    return uitkomst
@@ -0,0 +1,140 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    import yaml
+except ImportError:  # YAML is optioneel, JSON werkt altijd
+    yaml = None
+
+import export
+import ingest
+from cache import SolveCache, run_solver_met_cache
+from solver import show_kolommen, OnmogelijkeInvoer, OPLOSSING_GEVONDEN
+
+SAMENVATTING = ['bestand', 'status', 'musici', 'shows', 'seconden', 'rooster', 'melding']
+
+
+# 1. INSTELLINGEN INLEZEN
+def lees_instellingen(pad):
+    # Limieten ({"Viool 1": 4, ...}) of regels ([{"type": "conflict", ...}, ...]) uit JSON of YAML
+    with open(pad, encoding='utf-8') as f:
+        if pad.lower().endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise SystemExit(f"{pad}: voor YAML is PyYAML nodig (pip install pyyaml), of gebruik JSON")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def _eigen_bestand(werkboek, soort):
+    # Per werkboek mag er naast de algemene instellingen een eigen bestand staan,
+    # bv. "Harmonie.limits.json" naast "Harmonie.xlsx"
+    stam = os.path.splitext(werkboek)[0]
+    for ext in ('.json', '.yaml', '.yml'):
+        if os.path.exists(f"{stam}.{soort}{ext}"):
+            return f"{stam}.{soort}{ext}"
+    return None
+
+
+def werkboeken(map_pad):
+    return sorted(
+        os.path.join(map_pad, naam) for naam in os.listdir(map_pad)
+        if os.path.splitext(naam)[1].lower().lstrip('.') in ingest.FORMATEN and not naam.startswith('~$')
+    )
+
+
+# 2. EEN WERKBOEK OPLOSSEN (in een los proces)
+def los_werkboek(pad, limits, regels, uit_map, opties, cache_pad=None):
+    naam = os.path.basename(pad)
+    regel = {'bestand': naam, 'status': None, 'musici': None, 'shows': None,
+             'seconden': None, 'rooster': None, 'melding': ''}
+    begin = time.perf_counter()
+    try:
+        with open(pad, 'rb') as f:
+            df = ingest.lees_rooster(f.read(), naam)
+        regel['musici'] = df['Naam'].nunique()
+        regel['shows'] = len(show_kolommen(df))
+        cache = SolveCache(cache_pad) if cache_pad else None
+        status, rooster = run_solver_met_cache(cache, df, limits, regels, **opties)
+        regel['status'] = status
+        if status in OPLOSSING_GEVONDEN:
+            uit = os.path.join(uit_map, f"{os.path.splitext(naam)[0]}_rooster.xlsx")
+            with open(uit, 'wb') as f:
+                f.write(export.maak_excel(rooster))
+            regel['rooster'] = os.path.basename(uit)
+    except OnmogelijkeInvoer as e:
+        regel['status'] = "Infeasible"
+        regel['melding'] = str(e)
+    except (ValueError, OSError) as e:
+        regel['status'] = "Fout"
+        regel['melding'] = str(e)
+    regel['seconden'] = round(time.perf_counter() - begin, 2)
+    return regel
+
+
+# 3. ALLES
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Los alle roosters in een map op, zonder de Streamlit app.")
+    parser.add_argument('map', help="map met .xlsx/.csv/.parquet roosters")
+    parser.add_argument('--limits', help="JSON/YAML met max per instrument (geldt voor alle roosters)")
+    parser.add_argument('--regels', help="JSON/YAML met een lijst regels (geldt voor alle roosters)")
+    parser.add_argument('--uit', default='resultaten', help="map voor roosters en samenvatting")
+    parser.add_argument('--workers', type=int, default=None, help="aantal roosters tegelijk (standaard: aantal cores)")
+    parser.add_argument('--backend', default='pulp', help="pulp, highs of portfolio (meerdere solvers racen)")
+    parser.add_argument('--time-limit', type=float, default=None)
+    parser.add_argument('--gap', type=float, default=None)
+    parser.add_argument('--threads', type=int, default=1, help="threads per solve")
+    parser.add_argument('--venster', type=int, default=None, help="heel seizoen in stappen van zoveel shows")
+    parser.add_argument('--overlap', type=int, default=None, help="shows die elke stap opnieuw bekeken worden")
+    parser.add_argument('--cache', default=None, help="SQLite bestand met eerdere uitkomsten (ongewijzigde roosters niet opnieuw oplossen)")
+    args = parser.parse_args(argv)
+
+    limits = lees_instellingen(args.limits) if args.limits else {}
+    regels = lees_instellingen(args.regels) if args.regels else []
+    opties = dict(backend=args.backend, time_limit=args.time_limit, gap=args.gap, threads=args.threads,
+                  venster=args.venster, overlap=args.overlap)
+
+    paden = werkboeken(args.map)
+    if not paden:
+        print(f"Geen roosters gevonden in {args.map}")
+        return 1
+    os.makedirs(args.uit, exist_ok=True)
+
+    taken = []
+    for pad in paden:
+        eigen_limits = _eigen_bestand(pad, 'limits')
+        eigen_regels = _eigen_bestand(pad, 'regels')
+        taken.append((pad,
+                      lees_instellingen(eigen_limits) if eigen_limits else limits,
+                      lees_instellingen(eigen_regels) if eigen_regels else regels))
+
+    # spawn: zelfde keuze als bij het opsplitsen in solver.py
+    context = multiprocessing.get_context("spawn")
+    resultaten = []
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as pool:
+        futures = [pool.submit(los_werkboek, pad, lim, reg, args.uit, opties, args.cache) for pad, lim, reg in taken]
+        for future in as_completed(futures):
+            regel = future.result()
+            print(f"{regel['bestand']}: {regel['status']} ({regel['seconden']} s) {regel['melding']}".rstrip())
+            resultaten.append(regel)
+
+    resultaten.sort(key=lambda r: r['bestand'])
+    with open(os.path.join(args.uit, 'samenvatting.csv'), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=SAMENVATTING)
+        writer.writeheader()
+        writer.writerows(resultaten)
+    with open(os.path.join(args.uit, 'samenvatting.json'), 'w', encoding='utf-8') as f:
+        json.dump(resultaten, f, indent=2, ensure_ascii=False)
+
+    gelukt = sum(r['status'] in OPLOSSING_GEVONDEN for r in resultaten)
+    print(f"{gelukt}/{len(resultaten)} roosters opgelost, samenvatting in {args.uit}")
+    return 0 if gelukt == len(resultaten) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
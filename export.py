@@ -0,0 +1,67 @@
+import hashlib
+import io
+
+import pandas as pd
+import xlsxwriter
+from xlsxwriter.utility import xl_range
+
+
+def rooster_hash(dataframe):
+    # Inhoud + kolomnamen; bepaalt of een eerder gemaakt bestand nog klopt.
+    # Een Rooster uit de solver: de bool matrix plus namen/instrumenten/shows.
+    if hasattr(dataframe, 'bits'):
+        h = hashlib.sha256(dataframe.bits.tobytes())
+        for labels in (dataframe.namen, dataframe.instrumenten, dataframe.kolommen()):
+            h.update("\x1f".join(map(str, labels)).encode() + b"\x1e")
+        return h.hexdigest()
+    h = hashlib.sha256(pd.util.hash_pandas_object(dataframe, index=False).to_numpy().tobytes())
+    h.update("\x1f".join(map(str, dataframe.columns)).encode())
+    return h.hexdigest()
+
+
+def _cel(waarde):
+    # Vinkjes (editor) als ✅/., lege cellen leeg laten
+    if isinstance(waarde, bool):
+        return '✅' if waarde else '.'
+    if waarde is None or (isinstance(waarde, float) and pd.isna(waarde)):
+        return None
+    if hasattr(waarde, 'item'):
+        return waarde.item()
+    return waarde
+
+
+def maak_excel(dataframe, sheet_name='Rooster'):
+    # Schrijft rij voor rij (constant_memory): het geheugen blijft gelijk,
+    # hoe groot het rooster ook is. Kolom A = Naam, B = Instrument, daarna shows.
+    # Werkt met een DataFrame of direct met een Rooster uit de solver.
+    buffer = io.BytesIO()
+    workbook = xlsxwriter.Workbook(buffer, {'constant_memory': True})
+    worksheet = workbook.add_worksheet(sheet_name)
+    format_header = workbook.add_format({'bold': True, 'border': 1})
+    format_green = workbook.add_format({'bg_color': '#C6EFCE', 'font_color': '#006100', 'border': 1})
+    format_center = workbook.add_format({'align': 'center'})
+
+    if hasattr(dataframe, 'rijen'):
+        kolommen, rijen = dataframe.kolommen(), dataframe.rijen()
+    else:
+        kolommen, rijen = list(dataframe.columns), dataframe.itertuples(index=False, name=None)
+    n_rijen, n_kolommen = len(dataframe), len(kolommen)
+    worksheet.set_column(0, 0, 20)
+    worksheet.set_column(1, 1, 15)
+    if n_kolommen > 2:
+        worksheet.set_column(2, n_kolommen - 1, 12, format_center)
+
+    worksheet.write_row(0, 0, [str(c) for c in kolommen], format_header)
+    for i, rij in enumerate(rijen, start=1):
+        for j, waarde in enumerate(rij):
+            waarde = _cel(waarde)
+            if waarde is not None:
+                worksheet.write(i, j, waarde)
+
+    if n_rijen and n_kolommen > 2:
+        worksheet.conditional_format(xl_range(1, 2, n_rijen, n_kolommen - 1), {
+            'type': 'cell', 'criteria': 'equal to', 'value': '"✅"', 'format': format_green
+        })
+
+    workbook.close()
+    return buffer.getvalue()
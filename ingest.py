@@ -0,0 +1,104 @@
+import csv
+import io
+import os
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from solver import show_kolommen
+
+VERPLICHT = ['Naam', 'Instrument', 'Wens']
+FORMATEN = ['xlsx', 'csv', 'parquet']
+
+
+# 0. SJABLOON
+def maak_sjabloon(bezetting, num_shows):
+    # Leeg rooster om in te vullen: per instrument zoveel rijen als er muzikanten zijn
+    rows = []
+    show_cols = [f"Show {i+1}" for i in range(num_shows)]
+
+    for instr, count in bezetting:
+        for i in range(int(count)):
+            new_row = {"Naam": f"Naam {i+1}", "Instrument": instr, "Wens": "-"}
+            for show in show_cols:
+                new_row[show] = "-"
+            rows.append(new_row)
+
+    return pd.DataFrame(rows, columns=["Naam", "Instrument", "Wens"] + show_cols)
+
+
+# 1. INLEZEN (per bestandsformaat)
+def _lees_xlsx(inhoud):
+    # Read-only: openpyxl streamt de rijen in plaats van het hele werkboek op te bouwen
+    wb = load_workbook(io.BytesIO(inhoud), read_only=True, data_only=True)
+    try:
+        rijen = wb.active.iter_rows(values_only=True)
+        kop = next(rijen, ())
+        data = [r for r in rijen if any(v is not None for v in r)]
+    finally:
+        wb.close()
+
+    # Lege kopcellen aan het eind (opgemaakte maar lege kolommen) weglaten
+    while kop and kop[-1] is None:
+        kop = kop[:-1]
+    kolommen = [str(k) if k is not None else f"Kolom {i + 1}" for i, k in enumerate(kop)]
+    return pd.DataFrame([r[:len(kolommen)] for r in data], columns=kolommen)
+
+
+def _lees_csv(inhoud):
+    # Google Forms exporteert met komma's, Nederlandse Excel met puntkomma's
+    begin = inhoud[:4096].decode('utf-8-sig', errors='ignore')
+    try:
+        scheiding = csv.Sniffer().sniff(begin, delimiters=',;\t').delimiter
+    except csv.Error:
+        scheiding = ','
+    return pd.read_csv(io.BytesIO(inhoud), sep=scheiding, encoding='utf-8-sig')
+
+
+def _lees_parquet(inhoud):
+    return pd.read_parquet(io.BytesIO(inhoud))
+
+
+LEZERS = {'xlsx': _lees_xlsx, 'csv': _lees_csv, 'parquet': _lees_parquet}
+
+
+def lees_tabel(inhoud, bestandsnaam):
+    soort = os.path.splitext(bestandsnaam)[1].lower().lstrip('.')
+    if soort not in LEZERS:
+        raise ValueError(f"Onbekend bestandsformaat '.{soort}' (kies uit: {', '.join(FORMATEN)})")
+    return LEZERS[soort](inhoud)
+
+
+# 2. SCHOONMAKEN
+def beschikbaarheid(kolom):
+    # Scores als compacte int8 (3/2/1/0); geen getal telt als 0, net als in de solver
+    cijfers = pd.to_numeric(kolom, errors='coerce').to_numpy(dtype=float)
+    return np.clip(np.nan_to_num(np.trunc(cijfers), nan=0.0), -128, 127).astype(np.int8)
+
+
+def maak_schoon(df):
+    df.columns = [str(c).strip() for c in df.columns]
+    ontbreekt = [c for c in VERPLICHT if c not in df.columns]
+    if ontbreekt:
+        raise ValueError(f"Je bestand mist verplichte kolommen: {ontbreekt}")
+
+    df = df.dropna(subset=['Naam', 'Instrument'])
+    cols_to_drop = [c for c in df.columns if 'Tijdstempel' in c or 'Timestamp' in c]
+    df = df.drop(columns=cols_to_drop)
+
+    # Shows meteen omzetten naar de beschikbaarheidsmatrix
+    shows = show_kolommen(df)
+    df = df.assign(**{s: beschikbaarheid(df[s]) for s in shows})
+    df['Naam'] = df['Naam'].astype(str).str.strip()
+
+    # Splits instrumenten (voor multi-instrumentalisten)
+    df['Instrument'] = df['Instrument'].astype(str).str.split(',')
+    df = df.explode('Instrument')
+    df['Instrument'] = df['Instrument'].str.strip()
+    df = df[df['Instrument'] != '']
+    return df.reset_index(drop=True)
+
+
+def lees_rooster(inhoud, bestandsnaam='rooster.xlsx'):
+    return maak_schoon(lees_tabel(inhoud, bestandsnaam))
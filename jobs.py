@@ -0,0 +1,228 @@
+import itertools
+import multiprocessing
+import os
+import pickle
+import signal
+import threading
+import time
+from collections import OrderedDict
+
+# Status van een job
+WACHTRIJ = "wachtrij"
+BEZIG = "bezig"
+KLAAR = "klaar"
+FOUT = "fout"
+GEANNULEERD = "geannuleerd"
+AFGEROND = (KLAAR, FOUT, GEANNULEERD)
+
+# Afgeronde jobs die niemand meer ophaalt, na zoveel seconden opruimen
+BEWAAR_SECONDEN = 600
+
+
+def _draai(verbinding, invoer):
+    # Draait in een eigen proces. Eigen procesgroep: bij annuleren gaan CBC en
+    # eventuele pool-processen (opsplitsen) mee.
+    if hasattr(os, 'setsid'):
+        os.setsid()
+    try:
+        functie, args, kwargs = pickle.loads(invoer)
+        uitkomst = (KLAAR, functie(*args, **kwargs))
+    except Exception as e:
+        uitkomst = (FOUT, e)
+    try:
+        verbinding.send(uitkomst)
+    except Exception as e:
+        # Bv. een exception die niet te picklen is
+        verbinding.send((FOUT, RuntimeError(str(e))))
+    verbinding.close()
+
+
+class Job:
+    def __init__(self, job_id, invoer, sleutel=None, eigenaar=None, verwacht=None):
+        self.id = job_id
+        self.invoer = invoer  # (functie, args, kwargs) gepickled bij het indienen
+        self.sleutel = sleutel
+        self.eigenaar = eigenaar
+        self.verwacht = verwacht  # verwachte duur in seconden (bv. de tijdslimiet), voor de voortgang
+        self.status = WACHTRIJ
+        self.ingediend = time.time()
+        self.gestart = None
+        self.klaar_op = None
+        self.resultaat = None
+        self.fout = None
+        self._proces = None
+        self._verbinding = None
+
+    def duur(self):
+        if self.gestart is None:
+            return 0.0
+        return (self.klaar_op or time.time()) - self.gestart
+
+    def voortgang(self):
+        # 0..1 op basis van de verstreken tijd; None als er geen verwachte duur is
+        if self.status in AFGEROND:
+            return 1.0
+        if self.status == WACHTRIJ or not self.verwacht:
+            return None
+        return min(self.duur() / self.verwacht, 0.99)
+
+
+class JobQueue:
+    # Solves buiten het Streamlit script: elke job draait in een eigen proces,
+    # hoogstens max_tegelijk tegelijk, de rest wacht. Eén wachtrij per server
+    # (st.cache_resource), gedeeld door alle sessies; thread-safe.
+
+    def __init__(self, max_tegelijk=2, bewaar=32):
+        self.max_tegelijk = max_tegelijk
+        self.bewaar = bewaar
+        self.jobs = OrderedDict()
+        self.uitkomsten = OrderedDict()  # sleutel -> resultaat, minst recent gebruikt valt eruit
+        self._lock = threading.Lock()
+        self._teller = itertools.count(1)
+        self._context = multiprocessing.get_context("spawn")
+        self._bewaker = None
+
+    # --- Publiek ---
+    def dien_in(self, functie, *args, sleutel=None, eigenaar=None, verwacht=None, **kwargs):
+        # functie moet op moduleniveau staan (spawn); geeft het job ID terug.
+        # De invoer wordt meteen gepickled: een job in de wachtrij rekent met de invoer
+        # van nu, ook als de aanroeper (bv. het model van de sessie) daarna verandert.
+        # Niet te picklen invoer geeft hier al een fout.
+        invoer = pickle.dumps((functie, args, kwargs), protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            job = Job(f"job-{next(self._teller)}", invoer, sleutel, eigenaar, verwacht)
+            if sleutel is not None and sleutel in self.uitkomsten:
+                # Zelfde invoer al eens opgelost: meteen klaar
+                self.uitkomsten.move_to_end(sleutel)
+                job.status, job.resultaat = KLAAR, self.uitkomsten[sleutel]
+                job.gestart = job.klaar_op = job.ingediend
+                job.invoer = None
+            self.jobs[job.id] = job
+            self._bijwerken()
+            self._start_bewaker()
+        return job.id
+
+    def status(self, job_id):
+        with self._lock:
+            self._bijwerken()
+            return self.jobs.get(job_id)
+
+    def haal_op(self, job_id):
+        # Afgeronde job ophalen en uit de lijst halen
+        with self._lock:
+            self._bijwerken()
+            job = self.jobs.get(job_id)
+            if job is not None and job.status in AFGEROND:
+                del self.jobs[job_id]
+            return job
+
+    def annuleer(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status in AFGEROND:
+                return False
+            self._stop(job)
+            self._bijwerken()
+            return True
+
+    def annuleer_verouderd(self, eigenaar, sleutel):
+        # Jobs van deze sessie met andere invoer dan nu op het scherm staat
+        with self._lock:
+            verouderd = [job for job in self.jobs.values()
+                         if job.eigenaar == eigenaar and job.sleutel != sleutel and job.status not in AFGEROND]
+            for job in verouderd:
+                self._stop(job)
+            self._bijwerken()
+            return [job.id for job in verouderd]
+
+    def plek_in_wachtrij(self, job_id):
+        # 1 = als eerste aan de beurt; None als de job niet (meer) wacht
+        with self._lock:
+            wachtend = [j.id for j in self.jobs.values() if j.status == WACHTRIJ]
+            return wachtend.index(job_id) + 1 if job_id in wachtend else None
+
+    # --- Intern (altijd onder self._lock) ---
+    def _bijwerken(self):
+        for job in self.jobs.values():
+            if job.status == BEZIG:
+                self._kijk_naar(job)
+
+        bezig = sum(job.status == BEZIG for job in self.jobs.values())
+        for job in self.jobs.values():
+            if bezig >= self.max_tegelijk:
+                break
+            if job.status == WACHTRIJ:
+                self._start(job)
+                bezig += 1
+
+        nu = time.time()
+        for job_id in [j.id for j in self.jobs.values()
+                       if j.status in AFGEROND and nu - j.klaar_op > BEWAAR_SECONDEN]:
+            del self.jobs[job_id]
+
+    def _start(self, job):
+        ontvanger, zender = self._context.Pipe(duplex=False)
+        job._proces = self._context.Process(target=_draai, args=(zender, job.invoer))
+        job._proces.start()
+        zender.close()
+        job._verbinding = ontvanger
+        job.status = BEZIG
+        job.gestart = time.time()
+
+    def _kijk_naar(self, job):
+        if job._verbinding.poll():
+            try:
+                status, waarde = job._verbinding.recv()
+            except EOFError:
+                status, waarde = FOUT, RuntimeError("Het rekenproces is onverwacht gestopt")
+            if status == KLAAR:
+                job.resultaat = waarde
+                if job.sleutel is not None:
+                    self.uitkomsten[job.sleutel] = waarde
+                    while len(self.uitkomsten) > self.bewaar:
+                        self.uitkomsten.popitem(last=False)
+            else:
+                job.fout = waarde
+            self._rond_af(job, status)
+        elif not job._proces.is_alive():
+            job.fout = RuntimeError("Het rekenproces is onverwacht gestopt")
+            self._rond_af(job, FOUT)
+
+    def _stop(self, job):
+        if job.status == BEZIG:
+            # Hele procesgroep (solver + CBC); kill() als het proces nog geen eigen groep had
+            if hasattr(os, 'killpg'):
+                try:
+                    os.killpg(job._proces.pid, signal.SIGKILL)
+                except (ProcessLookupError, PermissionError):
+                    pass
+            job._proces.kill()
+            self._rond_af(job, GEANNULEERD)
+        elif job.status == WACHTRIJ:
+            job.status = GEANNULEERD
+            job.klaar_op = time.time()
+
+    def _rond_af(self, job, status):
+        job.status = status
+        job.klaar_op = time.time()
+        job._proces.join(timeout=5)
+        job._verbinding.close()
+        job._proces = job._verbinding = None
+        job.invoer = None
+
+    def _start_bewaker(self):
+        # Achtergrondthread die klaar-meldingen ophaalt en wachtende jobs start,
+        # ook als geen enkele sessie op dat moment de status opvraagt
+        if self._bewaker is not None and self._bewaker.is_alive():
+            return
+        self._bewaker = threading.Thread(target=self._bewaak, name="jobqueue-bewaker", daemon=True)
+        self._bewaker.start()
+
+    def _bewaak(self):
+        while True:
+            time.sleep(0.2)
+            with self._lock:
+                self._bijwerken()
+                if all(job.status in AFGEROND for job in self.jobs.values()):
+                    self._bewaker = None
+                    return
@@ -1,158 +1,1419 @@
+import copy
+import logging
+import multiprocessing
+import os
+import re
+import signal
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.connection import wait
+
+import numpy as np
 import pulp
 import pandas as pd
 
-def run_solver(df, limits_per_instrument, extra_regels):
+# Score uit het formulier -> gewicht in de doelfunctie (geen getal telt als 0)
+SCORE_GEWICHTEN = {3: 10, 2: 5, 1: -100, 0: -10000}
+
+# Straf per vakje dat een reparatie anders zet dan het bewerkte rooster.
+# Groter dan elk verschil in scores: eerst zo min mogelijk wijzigen, dan pas voorkeur.
+WIJZIG_STRAF = 100000
+
+# Kolommen die altijd bij de muzikant horen en nooit een show zijn
+VASTE_KOLOMMEN = ['Naam', 'Instrument', 'Wens', 'Label', 'Resource_ID']
+
+logger = logging.getLogger(__name__)
+
+
+class OnmogelijkeInvoer(ValueError):
+    # Presolve ziet al zonder solver dat limieten/wensen/regels nooit kunnen kloppen
+    def __init__(self, meldingen):
+        super().__init__(meldingen)
+        self.meldingen = meldingen
+
+    def __str__(self):
+        return "; ".join(self.meldingen)
+
+
+class SolveStats:
+    # Meetgegevens van één planning: wandkloktijd per fase, grootte van het model
+    # en wat de solver zelf rapporteert. Bij opsplitsen worden de groepen opgeteld
+    # (fasetijden dus over de processen heen, nodes opgeteld, grootste gap).
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.status = None
+        self.fasen = {}
+        self.totaal = None
+        self.variabelen = 0
+        self.constraints = 0
+        self.nonzeros = 0
+        self.nodes = None
+        self.gap = None
+        self.samengevoegd = 0  # variabelen minder door uitwisselbare muzikanten (symmetrie)
+        self.geheugen = {}  # bytes per onderdeel van de sessie die deze planning bewaart (app)
+        self.winnaars = {}  # portfolio: configuratie -> aantal keer als eerste klaar
+
+    def meet_model(self, model):
+        self.variabelen += len(model.c)
+        for kolommen, _, _, _ in model.rijen():
+            self.constraints += 1
+            self.nonzeros += len(kolommen)
+
+    def voeg_toe(self, ander):
+        for fase, seconden in ander.fasen.items():
+            self.fasen[fase] = self.fasen.get(fase, 0.0) + seconden
+        self.variabelen += ander.variabelen
+        self.constraints += ander.constraints
+        self.nonzeros += ander.nonzeros
+        self.samengevoegd += ander.samengevoegd
+        for naam, aantal in ander.winnaars.items():
+            self.winnaars[naam] = self.winnaars.get(naam, 0) + aantal
+        if ander.nodes is not None:
+            self.nodes = (self.nodes or 0) + ander.nodes
+        if ander.gap is not None:
+            self.gap = max(self.gap or 0.0, ander.gap)
+
+    def als_dict(self):
+        return {
+            'backend': self.backend, 'status': self.status,
+            'totaal_s': None if self.totaal is None else round(self.totaal, 4),
+            'fasen_s': {fase: round(s, 4) for fase, s in self.fasen.items()},
+            'variabelen': self.variabelen, 'constraints': self.constraints,
+            'nonzeros': self.nonzeros, 'nodes': self.nodes, 'gap': self.gap,
+            'samengevoegd': self.samengevoegd, 'winnaars': self.winnaars or None,
+            'geheugen_bytes': sum(self.geheugen.values()) or None,
+        }
+
+    def log(self):
+        logger.info("planning %s", self.als_dict())
+
+
+class Klok:
+    # Rondetijden: elke ronde() boekt de tijd sinds de vorige op een fase van
+    # stats (stats=None: alleen meelopen, niets vastleggen)
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.begin = self.vorige = time.perf_counter()
+
+    def ronde(self, fase):
+        nu = time.perf_counter()
+        if self.stats is not None:
+            self.stats.fasen[fase] = self.stats.fasen.get(fase, 0.0) + nu - self.vorige
+        self.vorige = nu
+
+    def totaal(self):
+        return time.perf_counter() - self.begin
+
+
+def cijfer_matrix(df, momenten):
+    # Alle scores in één keer omzetten naar een numerieke matrix (resources x shows)
+    cijfers = df[momenten].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    return np.nan_to_num(np.trunc(cijfers), nan=0.0)
+
+
+def _is_show(kolom):
+    # Een show kolom bevat cijfers (of is nog helemaal leeg); een kolom met
+    # alleen tekst, zoals Email, of met tijdstempels is geen show
+    if pd.api.types.is_bool_dtype(kolom) or pd.api.types.is_numeric_dtype(kolom):
+        return True
+    if pd.api.types.is_datetime64_any_dtype(kolom):
+        return False
+    cijfers = pd.to_numeric(kolom, errors='coerce')
+    tekst = kolom[cijfers.isna()].dropna().astype(str).str.strip()
+    return bool(cijfers.notna().any()) or tekst.isin(['', '-']).all()
+
+
+def show_kolommen(df):
+    return [c for c in df.columns
+            if c not in VASTE_KOLOMMEN and 'Tijdstempel' not in str(c) and 'Timestamp' not in str(c)
+            and _is_show(df[c])]
+
+
+def score_matrix(df, momenten):
+    cijfers = cijfer_matrix(df, momenten)
+    gewichten = np.zeros(cijfers.shape)
+    for cijfer, waarde in SCORE_GEWICHTEN.items():
+        gewichten[cijfers == cijfer] = waarde
+    return gewichten
+
 
-    df = df.dropna(subset=['Naam'])
+class ResourceIndex:
+    # Eenmalig per solve opgebouwd: welke rijen (posities in df) horen bij
+    # welke persoon en welk instrument. Eén lineaire doorloop over de rijen.
+
+    def __init__(self, df):
+        self.namen = df['Naam'].tolist()
+        self.instrumenten = df['Instrument'].tolist()
+        self.per_persoon = _posities(self.namen)
+        self.per_instrument = _posities(self.instrumenten)
+
+    def __len__(self):
+        return len(self.namen)
+
+    def rollen(self, persoon):
+        return self.per_persoon.get(persoon, [])
+
+
+def _posities(waarden):
+    posities = {}
+    for i, sleutel in enumerate(waarden):
+        posities.setdefault(sleutel, []).append(i)
+    return posities
+
+
+class PlanningModel:
+    # Het probleem los van een solver: doelfunctie, grenzen en de constraints
+    # als rijen (kolommen, coefficienten, ondergrens, bovengrens) per groep.
+    # Elke backend bouwt hieruit zijn eigen model.
+
+    def __init__(self, index, momenten, beschikbaar=None):
+        self.index = index
+        self.momenten = momenten
+        # Kolomnummer van variabele x[resource, moment]; -1 = vakje bestaat niet
+        # in het model (presolve: die persoon kan dan niet)
+        if beschikbaar is None:
+            beschikbaar = np.ones((len(index), len(momenten)), dtype=bool)
+        self.kolommen = np.full(beschikbaar.shape, -1)
+        self.kolommen[beschikbaar] = np.arange(beschikbaar.sum())
+        n = int(beschikbaar.sum())
+        self.c = np.zeros(n)
+        self.ub = np.ones(n)
+        self.groepen = {}
+        self.versies = {}
+        self.start = None
+        # Vertaling naar PuLP die bij het model blijft (zie _PulpProbleem)
+        self._pulp = None
+        # Samengevoegd model voor uitwisselbare muzikanten (zie Symmetrie)
+        self._symmetrie = None
+
+    def __getstate__(self):
+        # De PuLP vertaling en het samengevoegde model gaan niet mee naar andere processen:
+        # een job (app) of deelnemer (portfolio) vertaalt het model daar in zijn geheel,
+        # alleen binnen één proces wordt de vertaling bijgewerkt (zie _PulpProbleem)
+        state = self.__dict__.copy()
+        state['_pulp'] = state['_symmetrie'] = None
+        return state
+
+    @property
+    def nbytes(self):
+        # Arrays en constraint-rijen (zonder de PuLP vertaling)
+        rijen = sum(k.nbytes + c.nbytes for rijen in self.groepen.values() for k, c, _, _ in rijen)
+        return self.kolommen.nbytes + self.c.nbytes + self.ub.nbytes + rijen
+
+    def repareer_vanaf(self, ingepland, straf=WIJZIG_STRAF):
+        # ingepland: bool matrix (resources x shows). Wordt de MIP start, en elke
+        # afwijking ervan kost 'straf': |x - s| = x * (1 - 2s) + s
+        # Geeft een kopie terug, zodat een (gecachet) model zelf niet verandert.
+        s = np.zeros(len(self.c))
+        bestaat = self.kolommen >= 0
+        s[self.kolommen[bestaat]] = ingepland[bestaat]
+        model = copy.copy(self)
+        model.start = s
+        model.c = self.c + straf * (2 * s - 1)
+        return model
+
+    def voeg_toe(self, groep, kolommen, coefs=None, lo=-np.inf, hi=np.inf):
+        kolommen = np.asarray(kolommen, dtype=int).ravel()
+        coefs = np.ones(len(kolommen)) if coefs is None else np.asarray(coefs, dtype=float).ravel()
+        # Vakjes die niet in het model zitten tellen als 0
+        bestaat = kolommen >= 0
+        self.groepen.setdefault(groep, []).append((kolommen[bestaat], coefs[bestaat], lo, hi))
+        self.versies[groep] = self.versies.get(groep, 0) + 1
+
+    def verwijder(self, groep):
+        self.groepen.pop(groep, None)
+        self.versies.pop(groep, None)
+
+    def zet_grenzen(self, groep, lo=None, hi=None):
+        # Alleen de rechterkant van de rijen in deze groep aanpassen
+        self.groepen[groep] = [
+            (k, c, r_lo if lo is None else lo, r_hi if hi is None else hi)
+            for k, c, r_lo, r_hi in self.groepen[groep]
+        ]
+        self.versies[groep] += 1
+
+    def _bereik(self, kolommen, coefs):
+        # Kleinste en grootste mogelijke waarde van een rij, gegeven 0 <= x <= ub
+        bijdrage = coefs * self.ub[kolommen]
+        return bijdrage[bijdrage < 0].sum(), bijdrage[bijdrage > 0].sum()
+
+    def groep_rijen(self, groep):
+        # Rijen die altijd kloppen (bv. uniek voor iemand met één instrument, of een
+        # limiet boven het aantal beschikbare spelers) gaan niet naar de solver
+        for kolommen, coefs, lo, hi in self.groepen[groep]:
+            laag, hoog = self._bereik(kolommen, coefs)
+            if lo <= laag and hoog <= hi:
+                continue
+            yield kolommen, coefs, lo, hi
+
+    def rijen(self):
+        for groep in self.groepen:
+            yield from self.groep_rijen(groep)
+
+    def tegenstrijdigheden(self):
+        # Rijen die met geen enkele keuze kunnen kloppen, per groep één melding
+        meldingen = []
+        for groep, rijen in self.groepen.items():
+            for kolommen, coefs, lo, hi in rijen:
+                laag, hoog = self._bereik(kolommen, coefs)
+                if hoog < lo:
+                    meldingen.append(f"{groep}: minstens {lo:g} nodig, maar hoogstens {hoog:g} mogelijk")
+                    break
+                if laag > hi:
+                    meldingen.append(f"{groep}: hoogstens {hi:g} toegestaan, maar minstens {laag:g} nodig")
+                    break
+        return meldingen
+
+    def ingezet(self, waarden):
+        # Oplossing per kolom -> bool matrix (resources x shows)
+        bestaat = self.kolommen >= 0
+        matrix = np.zeros(self.kolommen.shape, dtype=bool)
+        matrix[bestaat] = np.round(waarden[self.kolommen[bestaat]]) == 1
+        return matrix
+
+    def matrix(self):
+        # Alle rijen als één CSR matrix plus onder- en bovengrenzen
+        from scipy.sparse import csr_array
+
+        rijen = list(self.rijen())
+        lengtes = [len(k) for k, _, _, _ in rijen]
+        indptr = np.concatenate([[0], np.cumsum(lengtes)]).astype(int)
+        indices = np.concatenate([k for k, _, _, _ in rijen]) if rijen else np.zeros(0, dtype=int)
+        data = np.concatenate([c for _, c, _, _ in rijen]) if rijen else np.zeros(0)
+        A = csr_array((data, indices, indptr), shape=(len(rijen), len(self.c)))
+        lo = np.array([r[2] for r in rijen], dtype=float)
+        hi = np.array([r[3] for r in rijen], dtype=float)
+        return A, lo, hi
+
+
+def bouw_model(df, limits_per_instrument, extra_regels, presolve=True, stats=None):
+    # presolve: een 0 (of geen getal) betekent echt "kan niet"; die vakjes krijgen
+    # geen variabele. Zonder presolve worden ze alleen zwaar bestraft.
+    klok = Klok(stats)
+
+    df = df.dropna(subset=['Naam']).reset_index(drop=True)
     
     # 1. DATA VOORBEREIDEN
-    # Unieke ID maken voor elke rij (voor het geval Jan twee instrumenten speelt)
-    df['Resource_ID'] = df['Naam'].astype(str) + " (" + df['Instrument'].astype(str) + ")"
-    
-    resources = df['Resource_ID'].tolist()
-    unieke_personen = df['Naam'].unique().tolist()
-    instrumenten = df['Instrument'].unique().tolist()
+    # Elke rij is een resource (Jan met twee instrumenten heeft twee rijen)
+    index = ResourceIndex(df)
     
     # Bepaal de show kolommen (alles wat geen standaard kolom is)
-    vaste_kolommen = ['Naam', 'Instrument', 'Wens', 'Label', 'Resource_ID']
-    momenten = [c for c in df.columns if c not in vaste_kolommen]
+    momenten = show_kolommen(df)
 
-    # Lookups
-    res_instr_map = df.set_index('Resource_ID')['Instrument'].to_dict()
-    res_naam_map = df.set_index('Resource_ID')['Naam'].to_dict()
     # Wens (eerste wens die we vinden per persoon)
     persoon_wens_map = df.groupby('Naam')['Wens'].first().to_dict()
 
     # 2. MODEL OPBOUWEN
-    prob = pulp.LpProblem("Orkest_Planner", pulp.LpMaximize)
-
-    # Variabelen: x[resource, moment]
-    x = pulp.LpVariable.dicts("inzet", 
-                              ((r, m) for r in resources for m in momenten), 
-                              cat='Binary')
+    gewichten = score_matrix(df, momenten)
+    beschikbaar = cijfer_matrix(df, momenten) != 0 if presolve else None
+    model = PlanningModel(index, momenten, beschikbaar)
+    kol = model.kolommen
+    klok.ronde('voorbereiden')
 
     # 3. DOELFUNCTIE
-    score = 0
-    for r in resources:
-        for m in momenten:
-            val = df[df['Resource_ID'] == r][m].values[0]
-            try:
-                cijfer = int(val)
-            except:
-                cijfer = 0 # Valback als het geen getal is
-            
-            waarde = 0
-            if cijfer == 3: waarde = 10
-            elif cijfer == 2: waarde = 5
-            elif cijfer == 1: waarde = -100
-            elif cijfer == 0: waarde = -10000 
-            
-            score += x[r, m] * waarde
-
-    prob += score
+    model.c = gewichten[kol >= 0]
 
     # 4. CONSTRAINTS
     
     # A. Bezetting per Instrument (Sidebar Limieten)
-    for m in momenten:
-        for instr in instrumenten:
-            if instr in limits_per_instrument:
-                max_aantal = limits_per_instrument[instr]
-                # Tel alle resources van dit instrument
-                aantal_ingepland = pulp.lpSum([x[r, m] for r in resources if res_instr_map[r] == instr])
-                prob += aantal_ingepland <= max_aantal
+    for instr in index.per_instrument:
+        if instr in limits_per_instrument:
+            voeg_limiet_toe(model, instr, limits_per_instrument[instr])
 
     # B. UNICITEIT (1 persoon kan maar 1 ding tegelijk doen)
-    for p in unieke_personen:
-        mijn_rollen = [r for r in resources if res_naam_map[r] == p]
-        for m in momenten:
-            prob += pulp.lpSum([x[r, m] for r in mijn_rollen]) <= 1
+    for p, mijn_rollen in index.per_persoon.items():
+        for j in range(len(momenten)):
+            model.voeg_toe("uniek", kol[mijn_rollen, j], hi=1)
 
     # C. WENS (Totaal aantal shows)
-    for p in unieke_personen:
+    for p, mijn_rollen in index.per_persoon.items():
         wens_val = persoon_wens_map.get(p, "-")
         try:
             gewenst = int(wens_val)
             if gewenst > 0:
-                mijn_rollen = [r for r in resources if res_naam_map[r] == p]
-                totaal_ingepland = pulp.lpSum([x[r, m] for r in mijn_rollen for m in momenten])
-                prob += totaal_ingepland >= gewenst - 1
-                prob += totaal_ingepland <= gewenst + 1
+                model.voeg_toe(f"wens:{p}", kol[mijn_rollen, :], lo=gewenst - 1, hi=gewenst + 1)
         except:
             pass # Geen getal ingevuld, negeer
 
     # D. EXTRA REGELS
     for regel in extra_regels:
-        try:
-            # 1. Conflict (Niet Samen)
-            if regel['type'] == 'conflict':
-                p1, p2 = regel['p1'], regel['p2']
-                if p1 in unieke_personen and p2 in unieke_personen:
-                    rollen_p1 = [r for r in resources if res_naam_map[r] == p1]
-                    rollen_p2 = [r for r in resources if res_naam_map[r] == p2]
-                    for m in momenten:
-                        prob += pulp.lpSum([x[r, m] for r in rollen_p1]) + pulp.lpSum([x[r, m] for r in rollen_p2]) <= 1
-                        
-            # 2. Samen
-            elif regel['type'] == 'samen':
-                p1, p2 = regel['p1'], regel['p2']
-                if p1 in unieke_personen and p2 in unieke_personen:
-                    rollen_p1 = [r for r in resources if res_naam_map[r] == p1]
-                    rollen_p2 = [r for r in resources if res_naam_map[r] == p2]
-                    for m in momenten:
-                        prob += pulp.lpSum([x[r, m] for r in rollen_p1]) == pulp.lpSum([x[r, m] for r in rollen_p2])
-
-            # 3. Must All
-            elif regel['type'] == 'must_all':
-                p1 = regel['p1']
-                if p1 in unieke_personen:
-                    rollen_p1 = [r for r in resources if res_naam_map[r] == p1]
-                    for m in momenten:
-                        prob += pulp.lpSum([x[r, m] for r in rollen_p1]) == 1
-
-            # 4. Force Show
-            elif regel['type'] == 'force_show':
-                p1_naam = regel['p1']
-                target_show = regel['show']
-                if target_show in momenten:
-                    p1_ids = [r for r in resources if res_naam_map[r] == p1_naam]
-                    prob += pulp.lpSum([x[pid, target_show] for pid in p1_ids]) == 1
-
-            # 5. Minimaal aantal shows
-            elif regel['type'] == 'min_shows':
-                p1_naam = regel['p1']
-                min_aantal = regel['count']
-                p1_ids = [r for r in resources if res_naam_map[r] == p1_naam]
-                
-                # Verzamel alle inzet variabelen
-                alle_inzet = []
-                for pid in p1_ids:
-                    for show in momenten:
-                        alle_inzet.append(x[pid, show])
-                prob += pulp.lpSum(alle_inzet) >= min_aantal
-        except Exception as e:
-            print(f"Fout bij regel {regel}: {e}")
-
-    # 5. OPLOSSEN
-    prob.solve()
+        voeg_regel_toe(model, regel)
+
+    klok.ronde('model bouwen')
+    return model
+
+
+def regel_naam(regel):
+    # Leesbare, vaste naam van een regel, bv. "conflict(Jan, Piet)"
+    args = ", ".join(str(v) for k, v in regel.items() if k != 'type')
+    return f"{regel.get('type')}({args})"
+
+
+def voeg_limiet_toe(model, instr, max_aantal):
+    kol = model.kolommen
+    rollen = model.index.per_instrument.get(instr, [])
+    for j in range(len(model.momenten)):
+        model.voeg_toe(f"capaciteit:{instr}", kol[rollen, j], hi=max_aantal)
+
+
+def voeg_regel_toe(model, regel):
+    index, momenten, kol = model.index, model.momenten, model.kolommen
+    groep = f"regel:{regel_naam(regel)}"
+    try:
+        # 1. Conflict (Niet Samen)
+        if regel['type'] == 'conflict':
+            p1, p2 = regel['p1'], regel['p2']
+            if p1 in index.per_persoon and p2 in index.per_persoon:
+                rollen = index.rollen(p1) + index.rollen(p2)
+                for j in range(len(momenten)):
+                    model.voeg_toe(groep, kol[rollen, j], hi=1)
+                    
+        # 2. Samen
+        elif regel['type'] == 'samen':
+            p1, p2 = regel['p1'], regel['p2']
+            if p1 in index.per_persoon and p2 in index.per_persoon:
+                rollen_p1, rollen_p2 = index.rollen(p1), index.rollen(p2)
+                coefs = [1] * len(rollen_p1) + [-1] * len(rollen_p2)
+                for j in range(len(momenten)):
+                    model.voeg_toe(groep, kol[rollen_p1 + rollen_p2, j], coefs, lo=0, hi=0)
+
+        # 3. Must All
+        elif regel['type'] == 'must_all':
+            p1 = regel['p1']
+            if p1 in index.per_persoon:
+                for j in range(len(momenten)):
+                    model.voeg_toe(groep, kol[index.rollen(p1), j], lo=1, hi=1)
+
+        # 4. Force Show
+        elif regel['type'] == 'force_show':
+            target_show = regel['show']
+            if target_show in momenten:
+                j = momenten.index(target_show)
+                model.voeg_toe(groep, kol[index.rollen(regel['p1']), j], lo=1, hi=1)
+
+        # 5. Minimaal aantal shows
+        elif regel['type'] == 'min_shows':
+            model.voeg_toe(groep, kol[index.rollen(regel['p1']), :], lo=regel['count'])
+    except Exception as e:
+        logger.warning("Fout bij regel %s: %s", regel, e)
+    return groep
+
+
+class Planner:
+    # Blijvend model voor één ingelezen rooster (bv. in st.session_state).
+    # Limieten en regels zijn benoemde constraint-groepen: bij een wijziging wordt
+    # alleen die groep toegevoegd, verwijderd of krijgt hij een nieuwe rechterkant.
+
+    def __init__(self, df, limits_per_instrument=None, extra_regels=(), presolve=True):
+        self.model = bouw_model(df, {}, [], presolve)
+        self.limits = {}
+        self.regels = {}
+        self.zet_limieten(limits_per_instrument or {})
+        self.zet_regels(extra_regels)
+
+    def zet_limieten(self, limits_per_instrument):
+        for instr in list(self.limits):
+            if instr not in limits_per_instrument:
+                self.model.verwijder(f"capaciteit:{instr}")
+                del self.limits[instr]
+        for instr, max_aantal in limits_per_instrument.items():
+            if instr not in self.model.index.per_instrument or self.limits.get(instr) == max_aantal:
+                continue
+            if instr in self.limits:
+                self.model.zet_grenzen(f"capaciteit:{instr}", hi=max_aantal)
+            else:
+                voeg_limiet_toe(self.model, instr, max_aantal)
+            self.limits[instr] = max_aantal
+
+    def zet_regels(self, extra_regels):
+        gewenst = {regel_naam(regel): regel for regel in extra_regels}
+        for naam in list(self.regels):
+            if naam not in gewenst:
+                self.verwijder_regel(self.regels[naam])
+        for naam, regel in gewenst.items():
+            if naam not in self.regels:
+                self.voeg_regel_toe(regel)
+
+    def voeg_regel_toe(self, regel):
+        naam = regel_naam(regel)
+        if naam not in self.regels:
+            voeg_regel_toe(self.model, regel)
+            self.regels[naam] = regel
+
+    def verwijder_regel(self, regel):
+        naam = regel_naam(regel)
+        if self.regels.pop(naam, None) is not None:
+            self.model.verwijder(f"regel:{naam}")
+
+    def los_op(self, backend='pulp', start=None, stats=None, **opties):
+        return los_model_op(self.model, backend, start, stats, **opties)
+
+
+# 5. OPLOSSEN
+# Elke backend krijgt een PlanningModel en geeft (status, waarden per kolom) terug.
+# "Feasible" betekent: tijdslimiet bereikt, beste gevonden rooster maar niet bewezen optimaal.
+OPLOSSING_GEVONDEN = ("Optimal", "Feasible")
+
+
+class _PulpProbleem:
+    # PuLP vertaling van een PlanningModel. Blijft bij het model bewaard; bij een
+    # volgende solve worden alleen gewijzigde groepen (en zo nodig de doelfunctie)
+    # opnieuw naar PuLP expressies vertaald, de rest wordt hergebruikt.
+
+    def __init__(self, model):
+        self.ub = model.ub
+        self.x = [pulp.LpVariable(f"inzet_{k}", 0, ub, cat='Integer' if ub > 1 else 'Binary')
+                  for k, ub in enumerate(model.ub.tolist())]
+        self.c = None
+        self.doel = None
+        self.groepen = {}  # groep -> (versie, PuLP constraints)
+
+    def past_bij(self, model):
+        return self.ub is model.ub
+
+    def probleem(self, model):
+        if self.c is not model.c:
+            self.doel = pulp.LpAffineExpression(zip(self.x, model.c.tolist()))
+            self.c = model.c
+
+        for groep in list(self.groepen):
+            if model.versies.get(groep) != self.groepen[groep][0]:
+                del self.groepen[groep]
+        for groep in model.groepen:
+            if groep not in self.groepen:
+                self.groepen[groep] = (model.versies[groep], self._vertaal(model.groep_rijen(groep)))
+
+        prob = pulp.LpProblem("Orkest_Planner", pulp.LpMaximize)
+        prob.setObjective(self.doel)
+        teller = 0
+        for _, constraints in self.groepen.values():
+            for constraint in constraints:
+                teller += 1
+                prob.addConstraint(constraint, f"c{teller}")
+        return prob
+
+    def _vertaal(self, rijen):
+        constraints = []
+        for kolommen, coefs, lo, hi in rijen:
+            expr = pulp.LpAffineExpression(zip([self.x[k] for k in kolommen], coefs.tolist()))
+            if lo == hi:
+                constraints.append(expr == lo)
+                continue
+            if lo > -np.inf:
+                constraints.append(expr >= lo)
+            if hi < np.inf:
+                constraints.append(expr <= hi)
+        return constraints
+
+
+def _cbc_log(tekst, stats):
+    # Staat onderaan de CBC log, bv. "Enumerated nodes: 12" en (bij een tijdslimiet) "Gap: 0.01"
+    nodes = re.search(r"Enumerated nodes:\s+(\d+)", tekst)
+    gap = re.search(r"Gap:\s+([-+\d.eE]+)", tekst)
+    if nodes:
+        stats.nodes = int(nodes.group(1))
+    if gap:
+        stats.gap = float(gap.group(1))
+    elif "Optimal solution found" in tekst:
+        stats.gap = 0.0
+
+
+def _los_op_pulp(model, time_limit=None, gap=None, threads=None, stats=None, cbc_opties=()):
+    # cbc_opties: extra CBC instellingen, bv. ('randomCbcSeed 7', 'cuts root') (portfolio)
+    klok = Klok(stats)
+    if model._pulp is None or not model._pulp.past_bij(model):
+        model._pulp = _PulpProbleem(model)
+    prob, x = model._pulp.probleem(model), model._pulp.x
+
+    if model.start is not None:
+        for var, waarde in zip(x, model.start.tolist()):
+            var.setInitialValue(waarde)
+    klok.ronde('vertalen')
+
+    # Alleen als er gemeten wordt: CBC log naar een tijdelijk bestand voor nodes en gap
+    log_pad = None
+    if stats is not None:
+        fd, log_pad = tempfile.mkstemp(suffix=".log")
+        os.close(fd)
+    try:
+        prob.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit, gapRel=gap, threads=threads,
+                                     warmStart=model.start is not None, logPath=log_pad,
+                                     options=list(cbc_opties)))
+        if log_pad is not None:
+            with open(log_pad, errors='ignore') as f:
+                _cbc_log(f.read(), stats)
+    finally:
+        if log_pad is not None:
+            os.remove(log_pad)
+    klok.ronde('oplossen')
+
     status = pulp.LpStatus[prob.status]
-    
-    # 6. RESULTAAT
-    rooster_data = []
-    if status == "Optimal":
-        for r in resources:
-            row = {
-                'Naam': res_naam_map[r],
-                'Instrument': res_instr_map[r]
-            }
-            totaal = 0
-            for m in momenten:
-                if pulp.value(x[r, m]) == 1:
-                    row[m] = "✅"
-                    totaal += 1
-                else:
-                    row[m] = "."
-            row['Totaal'] = totaal
-            rooster_data.append(row)
-    
-    return status, pd.DataFrame(rooster_data)
\ No newline at end of file
+    if status == "Optimal" and prob.sol_status == pulp.LpSolutionIntegerFeasible:
+        status = "Feasible"
+    waarden = np.nan_to_num(np.array([v.varValue for v in x], dtype=float))
+    klok.ronde('waarden ophalen')
+    return status, waarden
+
+
+def _los_op_highs(model, time_limit=None, gap=None, threads=None, stats=None):
+    # threads en een MIP start geeft scipy niet door aan HiGHS; de wijzigstraf
+    # van een reparatie zit wel gewoon in de doelfunctie
+    from scipy.optimize import Bounds, LinearConstraint, milp
+
+    klok = Klok(stats)
+    A, lo, hi = model.matrix()
+    klok.ronde('vertalen')
+    constraints = [LinearConstraint(A, lo, hi)] if A.shape[0] else []
+    opties = {}
+    if time_limit is not None:
+        opties['time_limit'] = time_limit
+    if gap is not None:
+        opties['mip_rel_gap'] = gap
+    # milp minimaliseert, wij maximaliseren
+    res = milp(-model.c, integrality=np.ones(len(model.c)),
+               bounds=Bounds(0, model.ub), constraints=constraints, options=opties)
+    klok.ronde('oplossen')
+    if stats is not None:
+        stats.nodes = getattr(res, 'mip_node_count', None)
+        stats.gap = getattr(res, 'mip_gap', None)
+
+    status = {0: "Optimal", 2: "Infeasible", 3: "Unbounded"}.get(res.status, "Not Solved")
+    if res.status == 1 and res.x is not None:
+        status = "Feasible"
+    waarden = res.x if res.x is not None else np.zeros(len(model.c))
+    return status, waarden
+
+
+# Portfolio: dezelfde puzzel tegelijk met verschillende instellingen; wie als eerste
+# bewezen klaar is wint. CBC hangt sterk af van de seed en de strategie (soms 2 s,
+# soms 90 s voor hetzelfde rooster). (naam, backend, extra opties), in volgorde van
+# voorkeur; er draaien er zoveel als er cores zijn, minstens twee.
+PORTFOLIO = [
+    ('cbc', 'pulp', {}),
+    ('highs', 'highs', {}),
+    ('cbc seed 7', 'pulp', {'cbc_opties': ('randomCbcSeed 7',)}),
+    ('cbc cuts alleen in de root', 'pulp', {'cbc_opties': ('randomCbcSeed 13', 'cuts root')}),
+    ('cbc depth-first', 'pulp', {'cbc_opties': ('randomCbcSeed 29', 'nodeStrategy depthFirst')}),
+    ('cbc zonder heuristieken', 'pulp', {'cbc_opties': ('randomCbcSeed 41', 'heuristicsOnOff off')}),
+]
+
+
+def _highs_beschikbaar():
+    # scipy.optimize.milp (HiGHS) bestaat vanaf scipy 1.9
+    try:
+        from scipy.optimize import milp
+    except ImportError:
+        return False
+    return callable(milp)
+
+
+def portfolio_configuraties(aantal=None):
+    configuraties = [c for c in PORTFOLIO if c[1] != 'highs' or _highs_beschikbaar()]
+    return configuraties[:aantal or max(os.cpu_count() or 1, 2)]
+
+
+def _bewaak_ouder(ouder):
+    # Hoofdproces weg (bv. een geannuleerde job): eigen procesgroep, CBC incluis, opruimen
+    while os.getppid() == ouder:
+        time.sleep(0.5)
+    os.killpg(0, signal.SIGKILL)
+
+
+def _portfolio_deelnemer(verbinding, naam, model, backend, opties, meten):
+    # Draait in een eigen proces en eigen procesgroep, zodat een verliezer met zijn
+    # CBC proces in één keer gestopt kan worden
+    if hasattr(os, 'setsid'):
+        ouder = os.getppid()
+        os.setsid()
+        threading.Thread(target=_bewaak_ouder, args=(ouder,), daemon=True).start()
+    stats = SolveStats(backend) if meten else None
+    try:
+        status, waarden = BACKENDS[backend](model, stats=stats, **opties)
+        verbinding.send((status, np.asarray(waarden, dtype=float), stats))
+    except Exception as e:
+        logger.warning("portfolio: %s faalde: %s", naam, e)
+        verbinding.send(("Not Solved", None, stats))
+    verbinding.close()
+
+
+def _stop_proces(proces):
+    if hasattr(os, 'killpg'):
+        try:
+            os.killpg(proces.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    proces.kill()
+    proces.join()
+
+
+def _los_op_portfolio(model, time_limit=None, gap=None, threads=None, stats=None, configuraties=None):
+    # Alle configuraties tegelijk, elk in een eigen proces. De eerste die bewezen klaar
+    # is ("Optimal", of "Infeasible": dan kan het nooit) wint en de rest wordt gestopt.
+    # Komt niemand verder dan de tijdslimiet, dan het beste gevonden rooster.
+    klok = Klok(stats)
+    context = multiprocessing.get_context("spawn")
+    lopend = {}
+    for naam, backend, extra in configuraties or portfolio_configuraties():
+        ontvanger, zender = context.Pipe(duplex=False)
+        opties = dict(time_limit=time_limit, gap=gap, threads=threads, **extra)
+        proces = context.Process(target=_portfolio_deelnemer,
+                                 args=(zender, naam, model, backend, opties, stats is not None), daemon=True)
+        proces.start()
+        zender.close()
+        lopend[ontvanger] = (naam, proces)
+
+    winnaar, beste = None, None
+    try:
+        while lopend and winnaar is None:
+            for ontvanger in wait(list(lopend)):
+                naam, proces = lopend.pop(ontvanger)
+                try:
+                    status, waarden, deel_stats = ontvanger.recv()
+                except EOFError:
+                    status, waarden, deel_stats = "Not Solved", None, None
+                ontvanger.close()
+                proces.join()
+                uitkomst = (naam, status, waarden, deel_stats)
+                if status in ("Optimal", "Infeasible"):
+                    winnaar = uitkomst
+                    break
+                if status == "Feasible" and (beste is None or model.c @ waarden > model.c @ beste[2]):
+                    beste = uitkomst
+    finally:
+        for ontvanger, (_, proces) in lopend.items():
+            _stop_proces(proces)
+            ontvanger.close()
+
+    naam, status, waarden, deel_stats = winnaar or beste or (None, "Not Solved", None, None)
+    if stats is not None:
+        # 'portfolio' is wat overblijft naast de fasen van de winnaar: processen starten en stoppen
+        klok.ronde('portfolio')
+        if naam is not None:
+            stats.winnaars[naam] = stats.winnaars.get(naam, 0) + 1
+        if deel_stats is not None:
+            for fase, seconden in deel_stats.fasen.items():
+                stats.fasen[fase] = stats.fasen.get(fase, 0.0) + seconden
+                stats.fasen['portfolio'] -= seconden
+            stats.nodes, stats.gap = deel_stats.nodes, deel_stats.gap
+    return status, (waarden if waarden is not None else np.zeros(len(model.c)))
+
+
+BACKENDS = {
+    'pulp': _los_op_pulp,
+    'highs': _los_op_highs,
+    'portfolio': _los_op_portfolio,
+}
+
+
+class Symmetrie:
+    # Muzikanten met hetzelfde instrument en dezelfde scores, zonder wens, zonder
+    # persoonlijke regels en met één instrument zijn uitwisselbaar: ze zitten alleen
+    # in de capaciteitsrijen. CBC verdoet dan veel tijd aan rijen die op hetzelfde
+    # neerkomen (Jan of Piet). Per klasse en show blijft één geheeltallige kolom
+    # over: hoeveel van hen er spelen. terug() verdeelt dat weer over de personen.
+
+    def __init__(self, model):
+        self.bron = model
+        self.sleutel = self._sleutel(model)
+        kol = model.kolommen
+
+        # Kolommen die in iets anders dan capaciteit (of een triviale uniek-rij) zitten
+        gebonden = model.ub != 1
+        for groep, rijen in model.groepen.items():
+            for kolommen, coefs, _, _ in rijen:
+                if groep.startswith('capaciteit:'):
+                    gebonden[kolommen[coefs != 1]] = True
+                elif groep != 'uniek' or len(kolommen) > 1:
+                    gebonden[kolommen] = True
+
+        bestaat = kol >= 0
+        vrij = bestaat.any(axis=1) & ~(gebonden[np.where(bestaat, kol, 0)] & bestaat).any(axis=1)
+        scores = np.where(bestaat, model.c[np.where(bestaat, kol, 0)], np.nan)
+        per_klasse = {}
+        for r in np.flatnonzero(vrij):
+            sleutel = (model.index.instrumenten[r], bestaat[r].tobytes(), scores[r].tobytes())
+            per_klasse.setdefault(sleutel, []).append(r)
+        self.klassen = [np.array(leden) for leden in per_klasse.values() if len(leden) > 1]
+        self.model = None
+        if not self.klassen:
+            return
+
+        # Oude kolom -> nieuwe kolom; leden van een klasse vallen samen op de eerste
+        doel = np.arange(len(model.c))
+        for leden in self.klassen:
+            rij = bestaat[leden[0]]
+            doel[kol[leden][:, rij]] = kol[leden[0], rij]
+        behouden = np.unique(doel)
+        nieuw = np.full(len(model.c), -1)
+        nieuw[behouden] = np.arange(len(behouden))
+        self.kaart = nieuw[doel]
+
+        self.model = copy.copy(model)
+        self.model.c = model.c[behouden]
+        self.model.ub = np.bincount(self.kaart, weights=model.ub, minlength=len(behouden))
+        self.model.kolommen = np.where(bestaat, self.kaart[np.where(bestaat, kol, 0)], -1)
+        self.model.groepen, self.model.versies = {}, {}
+        self.model.start = self.model._pulp = self.model._symmetrie = None
+        self.versies = {}
+        self.bijwerken(model)
+
+    @staticmethod
+    def _sleutel(model):
+        # Alleen capaciteit mag veranderen zonder dat de klassen opnieuw moeten
+        groepen = tuple((g, v) for g, v in model.versies.items() if not g.startswith('capaciteit:'))
+        return id(model.c), id(model.ub), id(model.kolommen), groepen
+
+    def past_bij(self, model):
+        return self.bron is model and self.sleutel == self._sleutel(model)
+
+    def bijwerken(self, model):
+        # Gewijzigde (capaciteits)groepen opnieuw omzetten; de rest, en dus ook de
+        # PuLP vertaling van het samengevoegde model, blijft staan
+        for groep in list(self.model.groepen):
+            if groep not in model.groepen:
+                self.model.verwijder(groep)
+                del self.versies[groep]
+        for groep, rijen in model.groepen.items():
+            if self.versies.get(groep) == model.versies[groep]:
+                continue
+            # Een uniek-rij met één kolom (x <= 1) zou op een klasse het aantal beperken
+            self.model.groepen[groep] = [self._rij(*rij) for rij in rijen
+                                         if groep != 'uniek' or len(rij[0]) > 1]
+            self.model.versies[groep] = self.model.versies.get(groep, 0) + 1
+            self.versies[groep] = model.versies[groep]
+
+    def _rij(self, kolommen, coefs, lo, hi):
+        # Samengevallen kolommen één keer (alle coefficienten zijn dan 1)
+        kolommen, eerste = np.unique(self.kaart[kolommen], return_index=True)
+        return kolommen, coefs[eerste], lo, hi
+
+    def terug(self, waarden):
+        # Aantallen per klasse en show -> per persoon. Eerlijk en vast: per show de
+        # leden die tot nu toe het minst spelen, bij gelijke stand de eerste in het rooster.
+        volledig = waarden[self.kaart].copy()
+        kol = self.bron.kolommen
+        for leden in self.klassen:
+            rij = kol[leden[0]] >= 0
+            kolommen = kol[leden][:, rij]
+            aantallen = np.round(waarden[self.kaart[kolommen[0]]]).astype(int)
+            gespeeld = np.zeros(len(leden), dtype=int)
+            volledig[kolommen] = 0
+            for j, aantal in enumerate(aantallen):
+                gekozen = np.lexsort((np.arange(len(leden)), gespeeld))[:aantal]
+                volledig[kolommen[gekozen, j]] = 1
+                gespeeld[gekozen] += 1
+        return volledig
+
+
+def symmetrie_reductie(model):
+    # Samengevoegd model bij dit model, bewaard en bijgewerkt zoals _PulpProbleem.
+    # None als er niets samen te voegen is, of bij een reparatie (start).
+    if model.start is not None:
+        return None
+    if model._symmetrie is None or not model._symmetrie.past_bij(model):
+        model._symmetrie = Symmetrie(model)
+    elif model._symmetrie.klassen:
+        model._symmetrie.bijwerken(model)
+    return model._symmetrie if model._symmetrie.klassen else None
+
+
+def los_op(model, backend='pulp', symmetrie=True, **opties):
+    # symmetrie: uitwisselbare muzikanten samenvoegen (zie Symmetrie)
+    if backend not in BACKENDS:
+        raise ValueError(f"Onbekende backend '{backend}', kies uit {list(BACKENDS)}")
+    stats = opties.get('stats')
+    klok = Klok(stats)
+    reductie = symmetrie_reductie(model) if symmetrie else None
+    if symmetrie:
+        klok.ronde('symmetrie')
+    if reductie is None:
+        return BACKENDS[backend](model, **opties)
+
+    if stats is not None:
+        stats.samengevoegd += len(model.c) - len(reductie.model.c)
+    status, waarden = BACKENDS[backend](reductie.model, **opties)
+    return status, reductie.terug(np.asarray(waarden, dtype=float))
+
+
+# 6. RESULTAAT
+class Rooster:
+    # Uitkomst van een solve: ingepland ja/nee per resource en show, ingepakt tot
+    # bits (8 vakjes per byte), met de namen, instrumenten en shows erbij als tuples.
+    # Een bewerkte versie (met_ingezet/met_vinkjes) deelt die tuples met het origineel.
+    # Pas bij tonen of exporteren wordt er een tabel van gemaakt (als_vinkjes met
+    # ✅/., als_bool voor de editor).
+
+    def __init__(self, namen, instrumenten, momenten, ingezet):
+        self.namen = tuple(namen)
+        self.instrumenten = tuple(instrumenten)
+        self.momenten = tuple(momenten)
+        ingezet = np.asarray(ingezet, dtype=bool).reshape(len(self.namen), len(self.momenten))
+        self.bits = np.packbits(ingezet, axis=1)
+
+    @classmethod
+    def leeg(cls, momenten=()):
+        return cls([], [], momenten, np.zeros((0, len(momenten)), dtype=bool))
+
+    @classmethod
+    def samenvoegen(cls, delen, posities):
+        # Deelroosters (opsplitsen) terug op hun oorspronkelijke rijen
+        n = sum(len(p) for p in posities)
+        namen, instrumenten = [None] * n, [None] * n
+        ingezet = np.zeros((n, len(delen[0].momenten)), dtype=bool)
+        for deel, rijen in zip(delen, posities):
+            for r, naam, instr in zip(rijen, deel.namen, deel.instrumenten):
+                namen[r], instrumenten[r] = naam, instr
+            ingezet[rijen] = deel.ingezet
+        return cls(namen, instrumenten, delen[0].momenten, ingezet)
+
+    def met_ingezet(self, ingezet):
+        # Zelfde resources en shows (zelfde tuples), andere vinkjes
+        return Rooster(self.namen, self.instrumenten, self.momenten, ingezet)
+
+    def met_vinkjes(self, tabel):
+        # Tabel uit de editor (in willekeurige volgorde) terug naar dit rooster
+        return self.met_ingezet(_vinkjes(tabel, self.namen, self.instrumenten, self.momenten))
+
+    def __len__(self):
+        return len(self.namen)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    @property
+    def ingezet(self):
+        # Uitgepakt (resources x shows); bij herhaald gebruik één keer opvragen
+        return np.unpackbits(self.bits, axis=1, count=len(self.momenten)).view(bool)
+
+    @property
+    def totaal(self):
+        return self.ingezet.sum(axis=1)
+
+    def kolommen(self):
+        return ['Naam', 'Instrument', *self.momenten, 'Totaal']
+
+    def rijen(self):
+        # Rij voor rij met ✅/. (voor export zonder hele tabel in het geheugen)
+        ingezet = self.ingezet
+        for naam, instr, rij, totaal in zip(self.namen, self.instrumenten, ingezet, ingezet.sum(axis=1).tolist()):
+            yield (naam, instr, *np.where(rij, "✅", ".").tolist(), totaal)
+
+    def _tabel(self, waarden, totaal):
+        tabel = pd.DataFrame(waarden, columns=list(self.momenten))
+        tabel.insert(0, 'Instrument', self.instrumenten)
+        tabel.insert(0, 'Naam', self.namen)
+        tabel['Totaal'] = totaal
+        return tabel
+
+    def als_vinkjes(self):
+        ingezet = self.ingezet
+        return self._tabel(np.where(ingezet, "✅", "."), ingezet.sum(axis=1))
+
+    def als_bool(self):
+        ingezet = self.ingezet
+        return self._tabel(ingezet, ingezet.sum(axis=1))
+
+
+def _vinkjes(tabel, namen, instrumenten, momenten):
+    # (Bewerkte) tabel -> bool matrix in de volgorde van namen/instrumenten.
+    # Vinkjes mogen True of "✅" zijn; ontbrekende rijen/shows tellen als niet ingepland.
+    tabel = tabel.drop_duplicates(['Naam', 'Instrument']).set_index(['Naam', 'Instrument'])
+    sleutels = pd.MultiIndex.from_arrays([list(namen), list(instrumenten)])
+    tabel = tabel.reindex(index=sleutels, columns=list(momenten))
+    return ((tabel == True) | (tabel == "✅")).to_numpy()
+
+
+def maak_rooster(model, waarden):
+    return Rooster(model.index.namen, model.index.instrumenten, model.momenten, model.ingezet(waarden))
+
+
+def start_matrix(model, rooster_df):
+    # Een (bewerkt) rooster terugleggen op de resources van het model
+    if isinstance(rooster_df, Rooster):
+        if (rooster_df.namen, rooster_df.instrumenten, rooster_df.momenten) == \
+                (tuple(model.index.namen), tuple(model.index.instrumenten), tuple(model.momenten)):
+            return rooster_df.ingezet
+        rooster_df = rooster_df.als_bool()
+    return _vinkjes(rooster_df, model.index.namen, model.index.instrumenten, model.momenten)
+
+
+def wijzigingen(voor_df, na_df, momenten):
+    # Welke vakjes verschillen tussen twee roosters (Rooster, bool of ✅), per Naam/Instrument/Show
+    if isinstance(voor_df, Rooster):
+        voor_df = voor_df.als_bool()
+    if isinstance(na_df, Rooster):
+        na_df = na_df.als_bool()
+    sleutel = ['Naam', 'Instrument']
+    voor = voor_df.set_index(sleutel)[momenten].isin([True, "✅"])
+    na = na_df.set_index(sleutel)[momenten].isin([True, "✅"]).reindex(voor.index, fill_value=False)
+    verschil = (voor != na).stack()
+    verschil = verschil[verschil]
+    rijen = []
+    for naam, instr, show in verschil.index:
+        rijen.append({
+            'Naam': naam,
+            'Instrument': instr,
+            'Show': show,
+            'Wijziging': "➕ Ingepland" if na.loc[(naam, instr), show] else "➖ Uitgeroosterd",
+        })
+    return pd.DataFrame(rijen, columns=['Naam', 'Instrument', 'Show', 'Wijziging'])
+
+
+# 7. OPSPLITSEN IN ONAFHANKELIJKE GROEPEN
+def componenten(df, limits_per_instrument, extra_regels):
+    # Graaf met personen en instrumenten als knopen. Een persoon hangt aan elk
+    # instrument met een (bindende) limiet dat hij speelt, en aan de andere persoon
+    # van een conflict/samen regel. Losse componenten kunnen los opgelost worden.
+    from scipy.sparse import coo_array
+    from scipy.sparse.csgraph import connected_components
+
+    namen = df['Naam'].tolist()
+    instrumenten = df['Instrument'].tolist()
+    personen = {p: i for i, p in enumerate(dict.fromkeys(namen))}
+
+    # Een limiet die hoger is dan het aantal spelers bindt niemand aan elkaar
+    aantal_per_instr = pd.Series(instrumenten).value_counts().to_dict()
+    bindend = [instr for instr in dict.fromkeys(instrumenten)
+               if instr in limits_per_instrument and limits_per_instrument[instr] < aantal_per_instr[instr]]
+    instr_knoop = {instr: len(personen) + k for k, instr in enumerate(bindend)}
+
+    van, naar = [], []
+    for naam, instr in zip(namen, instrumenten):
+        if instr in instr_knoop:
+            van.append(personen[naam])
+            naar.append(instr_knoop[instr])
+    for regel in extra_regels:
+        if regel.get('type') in ('conflict', 'samen') and regel.get('p1') in personen and regel.get('p2') in personen:
+            van.append(personen[regel['p1']])
+            naar.append(personen[regel['p2']])
+
+    n = len(personen) + len(instr_knoop)
+    graaf = coo_array((np.ones(len(van)), (van, naar)), shape=(n, n))
+    _, labels = connected_components(graaf, directed=False)
+
+    groepen = {}
+    for persoon, knoop in personen.items():
+        groepen.setdefault(labels[knoop], []).append(persoon)
+    return list(groepen.values())
+
+
+def los_model_op(model, backend='pulp', start=None, stats=None, **opties):
+    # Een al gebouwd model oplossen; (status, rooster) zoals run_solver
+    if stats is not None:
+        stats.backend = backend
+        stats.meet_model(model)
+    klok = Klok(stats)
+    meldingen = model.tegenstrijdigheden()
+    if meldingen:
+        raise OnmogelijkeInvoer(meldingen)
+
+    if start is not None:
+        model = model.repareer_vanaf(start_matrix(model, start))
+    klok.ronde('controleren')
+    status, waarden = los_op(model, backend, stats=stats, **opties)
+
+    klok = Klok(stats)
+    rooster = maak_rooster(model, waarden) if status in OPLOSSING_GEVONDEN else Rooster.leeg(model.momenten)
+    klok.ronde('uitlezen')
+    return status, rooster
+
+
+def los_planning_op(model, backend='pulp', start=None, **opties):
+    # Als run_solver(..., stats=True) maar voor een al bijgewerkt (Planner) model,
+    # bv. in een apart proces (jobs.py): (status, rooster, stats)
+    stats = SolveStats(backend)
+    klok = Klok(stats)
+    status, rooster = los_model_op(model, backend, start, stats, **opties)
+    stats.status = status
+    stats.totaal = klok.totaal()
+    stats.log()
+    return status, rooster, stats
+
+
+def _los_deel_op(df, limits_per_instrument, extra_regels, backend, opties, start=None, presolve=True, stats=None):
+    model = bouw_model(df, limits_per_instrument, extra_regels, presolve, stats)
+    return los_model_op(model, backend, start, stats, **opties)
+
+
+def _los_delen_op(delen):
+    # Eén taak in de procespool: een paar onafhankelijke groepen, elk een eigen MILP.
+    # De stats van elke groep gaan mee terug naar het hoofdproces.
+    uitkomsten = []
+    for *deel, stats in delen:
+        status, rooster = _los_deel_op(*deel, stats=stats)
+        uitkomsten.append((status, rooster, stats))
+    return uitkomsten
+
+
+def _los_opgesplitst_op(df, limits_per_instrument, extra_regels, backend, opties, start, workers, presolve, stats=None):
+    klok = Klok(stats)
+    df = df.dropna(subset=['Naam']).reset_index(drop=True)
+    # Scores één keer omzetten naar getallen, niet in elke groep opnieuw
+    momenten = show_kolommen(df)
+    df = df.assign(**dict(zip(momenten, cijfer_matrix(df, momenten).T)))
+    groepen = componenten(df, limits_per_instrument, extra_regels)
+    if len(groepen) <= 1:
+        return _los_deel_op(df, limits_per_instrument, extra_regels, backend, opties, start, presolve, stats)
+
+    groep_van = {p: g for g, personen in enumerate(groepen) for p in personen}
+    labels = df['Naam'].map(groep_van).to_numpy()
+
+    # Elke regel hoort bij de groep van p1 (regels over onbekende personen bij de eerste,
+    # zodat een onmogelijke regel ook opgesplitst onmogelijk blijft)
+    regels_per_groep = [[] for _ in groepen]
+    for regel in extra_regels:
+        regels_per_groep[groep_van.get(regel.get('p1'), 0)].append(regel)
+
+    # Groepen verdelen over zoveel pakketten als er workers zijn, grootste eerst
+    # naar het lichtste pakket, zodat vele kleine groepen niet elk een taak kosten
+    workers = workers or os.cpu_count() or 1
+    grootte = np.bincount(labels, minlength=len(groepen))
+    pakketten = [[] for _ in range(min(workers, len(groepen)))]
+    gewicht = [0] * len(pakketten)
+    for g in np.argsort(-grootte, kind='stable'):
+        k = gewicht.index(min(gewicht))
+        pakketten[k].append(g)
+        gewicht[k] += grootte[g]
+    klok.ronde('opsplitsen')
+
+    # spawn: veilig vanuit een proces met threads (Streamlit)
+    context = multiprocessing.get_context("spawn")
+    uitkomsten = [None] * len(groepen)
+    with ProcessPoolExecutor(max_workers=len(pakketten), mp_context=context) as pool:
+        futures = {
+            pool.submit(_los_delen_op, [
+                (df[labels == g], limits_per_instrument, regels_per_groep[g], backend, opties, start, presolve,
+                 SolveStats(backend) if stats is not None else None)
+                for g in pakket
+            ]): pakket
+            for pakket in pakketten
+        }
+        for future, pakket in futures.items():
+            for g, uitkomst in zip(pakket, future.result()):
+                uitkomsten[g] = uitkomst
+
+    klok.ronde('parallel oplossen')
+    if stats is not None:
+        stats.backend = backend
+        for _, _, deel_stats in uitkomsten:
+            stats.voeg_toe(deel_stats)
+
+    statussen = [status for status, _, _ in uitkomsten]
+    mislukt = [status for status in statussen if status not in OPLOSSING_GEVONDEN]
+    if mislukt:
+        return ("Infeasible" if "Infeasible" in mislukt else mislukt[0]), Rooster.leeg(momenten)
+
+    # Terug in de oorspronkelijke volgorde van de rijen
+    rooster = Rooster.samenvoegen([deel for _, deel, _ in uitkomsten],
+                                  [np.flatnonzero(labels == g) for g in range(len(groepen))])
+    klok.ronde('samenvoegen')
+    return ("Feasible" if "Feasible" in statussen else "Optimal"), rooster
+
+
+# 8. SCENARIO'S (WAT ALS?)
+def zet_capaciteit(model, limits_per_instrument):
+    # Alleen de rechterkant van de capaciteitsrijen; zonder limiet = onbeperkt
+    for instr in model.index.per_instrument:
+        model.zet_grenzen(f"capaciteit:{instr}", hi=limits_per_instrument.get(instr, np.inf))
+
+
+def _los_scenarios_op(model, pakket, backend, opties):
+    # Eén taak in de procespool: een paar scenario's na elkaar op hetzelfde model.
+    # De PuLP vertaling blijft staan, alleen de capaciteitsgroepen worden opnieuw vertaald.
+    uitkomsten = []
+    for naam, limits in pakket:
+        zet_capaciteit(model, limits)
+        if model.tegenstrijdigheden():
+            uitkomsten.append((naam, "Infeasible", None))
+            continue
+        status, waarden = los_op(model, backend, **opties)
+        uitkomsten.append((naam, status, model.ingezet(waarden) if status in OPLOSSING_GEVONDEN else None))
+    return uitkomsten
+
+
+def vergelijk_scenarios(df, scenarios, extra_regels=(), backend='pulp', workers=None, presolve=True, **opties):
+    # scenarios: {naam: limits_per_instrument}. Het model wordt één keer gebouwd;
+    # per scenario verandert alleen de capaciteit. Geeft een vergelijkingstabel terug.
+    df = df.dropna(subset=['Naam']).reset_index(drop=True)
+    model = bouw_model(df, dict.fromkeys(df['Instrument'].unique(), np.inf), extra_regels, presolve)
+    scenarios = list(scenarios.items())
+
+    workers = min(workers or os.cpu_count() or 1, len(scenarios))
+    pakketten = [scenarios[k::workers] for k in range(workers)]
+    if workers <= 1:
+        uitkomsten = _los_scenarios_op(model, scenarios, backend, opties)
+    else:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = [pool.submit(_los_scenarios_op, model, pakket, backend, opties) for pakket in pakketten]
+            uitkomsten = [uitkomst for future in futures for uitkomst in future.result()]
+    per_naam = {naam: (status, ingezet) for naam, status, ingezet in uitkomsten}
+
+    # Kengetallen per scenario
+    cijfers = cijfer_matrix(df, model.momenten)
+    gewichten = score_matrix(df, model.momenten)
+    wensen = pd.to_numeric(df.groupby('Naam')['Wens'].first(), errors='coerce')
+    personen = [p for p in model.index.per_persoon if wensen.get(p, 0) > 0]
+
+    rijen = []
+    for naam, limits in scenarios:
+        status, ingezet = per_naam[naam]
+        rij = {'Scenario': naam, 'Status': status}
+        rij.update({f"Max {instr}": limits.get(instr) for instr in model.index.per_instrument})
+        if ingezet is not None:
+            afwijking = np.array([abs(ingezet[model.index.per_persoon[p]].sum() - wensen[p]) for p in personen])
+            rij.update({
+                'Doelwaarde': float(gewichten[ingezet].sum()),
+                'Ingezet': int(ingezet.sum()),
+                '3 = Graag': int((ingezet & (cijfers == 3)).sum()),
+                'Wens afwijking': int(afwijking.sum()),
+                'Naast wens': int((afwijking > 0).sum()),
+            })
+        rijen.append(rij)
+    return pd.DataFrame(rijen)
+
+
+# 9. DIAGNOSE (WAAROM GEEN ROOSTER?)
+# Deze groepen mogen wijken; "uniek" (één ding tegelijk) en de beschikbaarheid blijven hard
+REKBARE_GROEPEN = ('regel:', 'wens:', 'capaciteit:')
+
+
+def elastisch_model(model):
+    # Kopie van het model waarin elke rij van een rekbare groep twee extra kolommen
+    # krijgt: t_lo (tekort onder lo) en t_hi (overschot boven hi). Per groep één
+    # 0/1 kolom "wijkt"; een t mag alleen > 0 als die groep wijkt. De doelfunctie
+    # telt eerst het aantal groepen dat wijkt, dan pas hoe ver.
+    # Geeft het model terug plus per rekbare rij (groep, lo, hi, kolom t_lo, kolom t_hi).
+    c, ub = [np.zeros(len(model.c))], [model.ub]
+    volgende = len(model.c)
+
+    def nieuwe_kolommen(grenzen):
+        nonlocal volgende
+        ub.append(np.asarray(grenzen, dtype=float))
+        c.append(np.zeros(len(grenzen)))
+        volgende += len(grenzen)
+        return np.arange(volgende - len(grenzen), volgende)
+
+    elastisch = copy.copy(model)
+    elastisch.groepen, elastisch.versies = {}, {}
+    elastisch.start, elastisch._pulp = None, None
+    rekbaar, strafkolommen = [], []
+    for groep, rijen in model.groepen.items():
+        if not groep.startswith(REKBARE_GROEPEN):
+            elastisch.groepen[groep], elastisch.versies[groep] = list(rijen), 1
+            continue
+        ruimte = []
+        for kolommen, coefs, lo, hi in rijen:
+            laag, hoog = model._bereik(kolommen, coefs)
+            ruimte.append((max(lo - laag, 0.0), max(hoog - hi, 0.0)))
+        if not any(r_lo or r_hi for r_lo, r_hi in ruimte):
+            elastisch.groepen[groep], elastisch.versies[groep] = list(rijen), 1
+            continue
+
+        wijkt = nieuwe_kolommen([1.0])[0]
+        strafkolommen.append(wijkt)
+        for (kolommen, coefs, lo, hi), (r_lo, r_hi) in zip(rijen, ruimte):
+            t_lo, t_hi = nieuwe_kolommen([r_lo, r_hi])
+            elastisch.voeg_toe(groep, np.append(kolommen, [t_lo, t_hi]), np.append(coefs, [1, -1]), lo, hi)
+            for t, r in ((t_lo, r_lo), (t_hi, r_hi)):
+                if r:
+                    elastisch.voeg_toe(f"wijkt:{groep}", [t, wijkt], [1, -r], hi=0)
+            rekbaar.append((groep, lo, hi, t_lo, t_hi))
+
+    elastisch.ub = np.concatenate(ub)
+    elastisch.c = np.concatenate(c)
+    slack = np.concatenate([[t_lo, t_hi] for _, _, _, t_lo, t_hi in rekbaar]) if rekbaar else np.zeros(0, dtype=int)
+    elastisch.c[slack] = -1
+    elastisch.c[strafkolommen] = -(elastisch.ub[slack].sum() + 1)
+    return elastisch, rekbaar
+
+
+def _beschrijf_aanpassing(groep, rijen, n_rijen):
+    # rijen: (lo, hi, tekort, overschot) van de rijen in deze groep die wijken,
+    # n_rijen: hoeveel rijen de groep in totaal heeft
+    soort, naam = groep.split(':', 1)
+    if soort == 'capaciteit':
+        nodig = max(hi + overschot for _, hi, _, overschot in rijen)
+        return "Limiet", naam, f"max {rijen[0][1]:g} → {nodig:g} per show"
+    if soort == 'wens':
+        lo, hi, tekort, overschot = rijen[0]
+        if tekort:
+            return "Wens", naam, f"wens {(lo + hi) / 2:g}, maar hoogstens {lo - tekort:g} shows mogelijk"
+        return "Wens", naam, f"wens {(lo + hi) / 2:g}, maar minstens {hi + overschot:g} shows nodig"
+    if n_rijen == 1:
+        lo, hi, tekort, overschot = rijen[0]
+        if tekort:
+            return "Regel", naam, f"minstens {lo:g} → {lo - tekort:g}"
+        return "Regel", naam, f"hoogstens {hi:g} → {hi + overschot:g}"
+    return "Regel", naam, f"{len(rijen)}x niet na te komen"
+
+
+def diagnoseer(model, backend='pulp', **opties):
+    # Eén solve op het elastische model in plaats van regels één voor één weg te
+    # laten: het kleinste aantal regels, wensen en limieten dat moet wijken, en hoeveel.
+    # Geeft (status, tabel) terug; "Optimal" = bewezen het kleinste aantal aanpassingen.
+    elastisch, rekbaar = elastisch_model(model)
+    status, waarden = los_op(elastisch, backend, **opties)
+    kolommen = ['Soort', 'Naam', 'Aanpassing', 'Shows', 'Groep']
+    if status not in OPLOSSING_GEVONDEN:
+        return status, pd.DataFrame(columns=kolommen)
+
+    waarden = np.round(waarden)
+    per_groep = {}
+    for groep, lo, hi, t_lo, t_hi in rekbaar:
+        per_groep.setdefault(groep, []).append((lo, hi, waarden[t_lo], waarden[t_hi]))
+
+    rijen = []
+    for groep, groep_rijen in per_groep.items():
+        wijkend = [r for r in groep_rijen if r[2] or r[3]]
+        if not wijkend:
+            continue
+        soort, naam, aanpassing = _beschrijf_aanpassing(groep, wijkend, len(groep_rijen))
+        # Groepen met één rij per show (limieten, conflict, samen, ...): welke shows
+        shows = ""
+        if len(groep_rijen) == len(model.momenten) > 1:
+            shows = ", ".join(m for m, r in zip(model.momenten, groep_rijen) if r[2] or r[3])
+        rijen.append({'Soort': soort, 'Naam': naam, 'Aanpassing': aanpassing, 'Shows': shows, 'Groep': groep})
+    return status, pd.DataFrame(rijen, columns=kolommen)
+
+
+# 10. ROLLENDE HORIZON (HEEL SEIZOEN)
+def _los_rollend_op(df, limits_per_instrument, extra_regels, backend, opties, start, venster, overlap,
+                    presolve, stats=None):
+    # Een seizoen met honderden shows niet als één model: steeds een venster van
+    # 'venster' shows (kolomvolgorde = datumvolgorde) oplossen, de eerste
+    # venster - overlap shows vastleggen en doorschuiven. Wens en min_shows lopen mee
+    # als budget: wat al vastligt gaat eraf, de rest wordt naar rato over de nog
+    # komende shows verdeeld en het laatste venster krijgt precies de rest. Een venster
+    # laat genoeg over voor de verplichte shows erna (force_show, must_all) en neemt
+    # genoeg voor wat er na het venster nog kan.
+    # Geheugen en rekentijd groeien zo lineair met het aantal shows. "Optimal"
+    # betekent hier: elk venster optimaal, niet het seizoen als geheel.
+    klok = Klok(stats)
+    df = df.dropna(subset=['Naam']).reset_index(drop=True)
+    momenten = show_kolommen(df)
+    if venster >= len(momenten):
+        return _los_deel_op(df, limits_per_instrument, extra_regels, backend, opties, start, presolve, stats)
+
+    cijfers = cijfer_matrix(df, momenten)
+    df = df.assign(**dict(zip(momenten, cijfers.T)))
+    vast = [c for c in df.columns if c not in momenten]
+    index = ResourceIndex(df)
+    wensen = pd.to_numeric(df.groupby('Naam')['Wens'].first(), errors='coerce')
+    wensen = {p: int(w) for p, w in wensen.items() if w > 0}
+    gespeeld = dict.fromkeys(index.per_persoon, 0)
+    # Per persoon per show: verplicht (force_show, must_all) en of die persoon kan (presolve: geen 0)
+    verplicht = {p: np.zeros(len(momenten), dtype=int) for p in wensen}
+    kan = {p: (cijfers[index.rollen(p)] != 0).any(axis=0) if presolve else np.ones(len(momenten), dtype=bool)
+           for p in wensen}
+    for regel in extra_regels:
+        if regel.get('p1') in verplicht:
+            if regel.get('type') == 'must_all':
+                verplicht[regel['p1']][:] = 1
+            elif regel.get('type') == 'force_show' and regel.get('show') in momenten:
+                verplicht[regel['p1']][momenten.index(regel['show'])] = 1
+    ingezet = np.zeros((len(df), len(momenten)), dtype=bool)
+    stap = max(venster - (venster // 4 if overlap is None else overlap), 1)
+    klok.ronde('voorbereiden')
+
+    statussen = []
+    for begin in range(0, len(momenten), stap):
+        shows = momenten[begin:begin + venster]
+        laatste = begin + venster >= len(momenten)
+        vastleggen = len(shows) if laatste else stap
+        aandeel = len(shows) / (len(momenten) - begin)
+
+        regels = []
+        for regel in extra_regels:
+            if regel.get('type') == 'min_shows':
+                rest = regel['count'] - gespeeld.get(regel['p1'], 0)
+                nodig = rest if laatste else int(np.floor(rest * aandeel))
+                if nodig > 0:
+                    regels.append({**regel, 'count': nodig})
+            else:
+                regels.append(regel)
+
+        deel_stats = SolveStats(backend) if stats is not None else None
+        model = bouw_model(df[vast + shows].assign(Wens='-'), limits_per_instrument, regels, presolve, deel_stats)
+        kol = model.kolommen
+        for p, wens in wensen.items():
+            rollen = model.index.per_persoon[p]
+            rest = wens - gespeeld[p]
+            if laatste:
+                lo, hi = max(rest - 1, 0), max(rest + 1, 0)
+            else:
+                # De +1 speling geldt voor het seizoen, niet per venster: naar rato tot het
+                # eind van dit venster. Wel ruimte voor de verplichte shows hierin, en wat
+                # verplicht nog na dit venster komt blijft buiten het budget. Andersom moet
+                # minstens zoveel, dat de shows na dit venster genoeg zijn voor de rest.
+                eind = begin + len(shows)
+                hier, later = int(verplicht[p][begin:eind].sum()), int(verplicht[p][eind:].sum())
+                naar_rato = np.floor(wens * eind / len(momenten)) + 1 - gespeeld[p]
+                hi = max(min(max(naar_rato, hier), rest + 1 - later), 0)
+                # Niet meer vragen dan iemand in dit venster kan
+                mogelijk = int((kol[rollen] >= 0).any(axis=0).sum())
+                lo = max(np.ceil(rest * aandeel) - 1, rest - 1 - int(kan[p][eind:].sum()), 0)
+                lo = min(lo, mogelijk, hi)
+            model.voeg_toe(f"wens:{p}", kol[rollen, :], lo=lo, hi=hi)
+
+        try:
+            status, rooster = los_model_op(model, backend, start, deel_stats, **opties)
+        except OnmogelijkeInvoer as e:
+            raise OnmogelijkeInvoer([f"{shows[0]} t/m {shows[-1]}: {melding}" for melding in e.meldingen])
+        if stats is not None:
+            stats.voeg_toe(deel_stats)
+        statussen.append(status)
+        if status not in OPLOSSING_GEVONDEN:
+            return status, Rooster.leeg(momenten)
+
+        # Begin van het venster vastleggen, de overlap wordt in het volgende venster opnieuw bekeken
+        vastgelegd = rooster.ingezet[:, :vastleggen]
+        ingezet[:, begin:begin + vastleggen] = vastgelegd
+        for p, rollen in model.index.per_persoon.items():
+            gespeeld[p] += int(vastgelegd[rollen].sum())
+        if laatste:
+            break
+
+    status = "Feasible" if "Feasible" in statussen else "Optimal"
+    return status, Rooster(index.namen, index.instrumenten, momenten, ingezet)
+
+
+def run_solver(df, limits_per_instrument, extra_regels, backend='pulp',
+               time_limit=None, gap=None, threads=None, start=None,
+               decompose=False, workers=None, presolve=True, stats=False, symmetrie=True,
+               venster=None, overlap=None):
+    # backend: 'pulp' (CBC), 'highs' of 'portfolio': de configuraties uit PORTFOLIO racen
+    # in losse processen, de eerste die bewezen klaar is wint (stats.winnaars).
+    # start: een bewerkt rooster (Naam, Instrument, shows). Dan wordt er gerepareerd:
+    # het dichtstbijzijnde rooster dat aan alle regels voldoet.
+    # decompose: onafhankelijke groepen muzikanten parallel oplossen (workers processen).
+    # presolve: 0 = kan niet; geeft OnmogelijkeInvoer als regels daardoor nooit kunnen.
+    # stats: geef als derde waarde een SolveStats terug (tijd per fase, modelgrootte, nodes, gap)
+    # symmetrie: uitwisselbare muzikanten per show als één aantal oplossen (zie Symmetrie)
+    # venster: heel seizoen in stukken van zoveel shows oplossen; de laatste 'overlap'
+    # shows van elk venster (standaard een kwart) worden in het volgende opnieuw bekeken.
+    # De tijdslimiet geldt dan per venster. Gaat voor decompose.
+    opties = dict(time_limit=time_limit, gap=gap, threads=threads, symmetrie=symmetrie)
+    meting = SolveStats(backend) if stats else None
+    klok = Klok(meting)
+    if venster:
+        status, rooster = _los_rollend_op(df, limits_per_instrument, extra_regels, backend, opties,
+                                          start, venster, overlap, presolve, meting)
+    elif decompose:
+        status, rooster = _los_opgesplitst_op(df, limits_per_instrument, extra_regels, backend, opties,
+                                              start, workers, presolve, meting)
+    else:
+        status, rooster = _los_deel_op(df, limits_per_instrument, extra_regels, backend, opties,
+                                       start, presolve, meting)
+    if not stats:
+        return status, rooster
+
+    meting.status = status
+    meting.totaal = klok.totaal()
+    meting.log()
+    return status, rooster, meting
@@ -0,0 +1,36 @@
+import threading
+import time
+
+import pytest
+
+from jobs import JobQueue, AFGEROND, KLAAR
+
+
+def wacht_op(wachtrij, job_id):
+    for _ in range(300):
+        job = wachtrij.status(job_id)
+        if job.status in AFGEROND:
+            return job
+        time.sleep(0.1)
+    raise AssertionError(f"{job_id} niet klaar")
+
+
+def test_job_in_wachtrij_rekent_met_invoer_van_het_indienen():
+    # De eerste job houdt de enige plek bezet; de lijst verandert terwijl de tweede wacht
+    wachtrij = JobQueue(max_tegelijk=1)
+    wachtrij.dien_in(time.sleep, 1)
+    lijst = [1]
+    job_id = wachtrij.dien_in(len, lijst, sleutel=('lijst', 1))
+    lijst.append(2)
+
+    job = wacht_op(wachtrij, job_id)
+    assert job.status == KLAAR
+    assert job.resultaat == 1
+    assert wachtrij.uitkomsten[('lijst', 1)] == 1
+
+
+def test_niet_te_picklen_invoer_geeft_meteen_een_fout():
+    wachtrij = JobQueue()
+    with pytest.raises(TypeError):
+        wachtrij.dien_in(len, threading.Lock())
+    assert not wachtrij.jobs
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pulp
+import pytest
+
+import ingest
+from benchmark import genereer_rooster
+from solver import bouw_model, los_op, run_solver, score_matrix, show_kolommen, OPLOSSING_GEVONDEN
+
+
+def oude_doelfunctie(df, momenten):
+    # De doelfunctie zoals run_solver hem vroeger per vakje opbouwde
+    df = df.copy()
+    df['Resource_ID'] = df['Naam'].astype(str) + " (" + df['Instrument'].astype(str) + ")"
+    resources = df['Resource_ID'].tolist()
+    x = pulp.LpVariable.dicts("inzet", ((r, m) for r in resources for m in momenten), cat='Binary')
+
+    score = 0
+    for r in resources:
+        for m in momenten:
+            val = df[df['Resource_ID'] == r][m].values[0]
+            try:
+                cijfer = int(val)
+            except:
+                cijfer = 0
+
+            waarde = 0
+            if cijfer == 3: waarde = 10
+            elif cijfer == 2: waarde = 5
+            elif cijfer == 1: waarde = -100
+            elif cijfer == 0: waarde = -10000
+
+            score += x[r, m] * waarde
+
+    # Coefficienten als matrix (resources x shows), in dezelfde volgorde als df
+    coef = {v.name: c for v, c in score.items()}
+    return np.array([[coef.get(x[r, m].name, 0) for m in momenten] for r in resources])
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_score_matrix_gelijk_aan_oude_doelfunctie(seed):
+    ruw, _, _ = genereer_rooster(40, 4, 8, seed=seed)
+    momenten = show_kolommen(ruw)
+    # Ook vakjes die geen getal zijn of als getal in plaats van tekst binnenkomen
+    ruw.loc[0, momenten[0]] = None
+    ruw.loc[1, momenten[1]] = ""
+    ruw[momenten[2]] = pd.to_numeric(ruw[momenten[2]], errors='coerce')
+
+    np.testing.assert_array_equal(score_matrix(ruw, momenten), oude_doelfunctie(ruw, momenten))
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_model_doelfunctie_gelijk_aan_oude(seed):
+    # Zonder presolve heeft elk vakje een variabele; model.c moet dan precies
+    # de oude coefficienten bevatten, op het schoongemaakte (uitgeklapte) rooster
+    ruw, limits, regels = genereer_rooster(30, 3, 6, multi=0.3, seed=seed)
+    df = ingest.maak_schoon(ruw)
+    model = bouw_model(df, limits, regels, presolve=False)
+
+    oud = oude_doelfunctie(df, model.momenten)
+    np.testing.assert_array_equal(model.c[model.kolommen], oud)
+
+
+# (musici, instrumenten, shows, multi, regel_dichtheid, seed)
+INSTANTIES = [(40, 4, 8, 0.15, 0.05, 0), (60, 5, 10, 0.3, 0.05, 1), (25, 3, 6, 0.2, 0.1, 2)]
+
+
+@pytest.mark.parametrize("musici, instrumenten, shows, multi, dichtheid, seed", INSTANTIES)
+def test_highs_zelfde_uitkomst_als_pulp(musici, instrumenten, shows, multi, dichtheid, seed):
+    ruw, limits, regels = genereer_rooster(musici, instrumenten, shows, multi=multi,
+                                           regel_dichtheid=dichtheid, seed=seed)
+    model = bouw_model(ingest.maak_schoon(ruw), limits, regels)
+
+    uitkomst = {}
+    for backend in ('pulp', 'highs'):
+        status, waarden = los_op(model, backend, gap=0)
+        assert status in OPLOSSING_GEVONDEN
+        uitkomst[backend] = (status, model.c @ np.asarray(waarden, dtype=float))
+    assert uitkomst['pulp'][0] == uitkomst['highs'][0]
+    assert uitkomst['pulp'][1] == pytest.approx(uitkomst['highs'][1])
+
+
+def test_highs_zelfde_uitkomst_als_pulp_onmogelijk():
+    # Twee mensen op hetzelfde instrument moeten overal bij zijn, maar er is één plek
+    ruw, limits, _ = genereer_rooster(20, 2, 4, multi=0, regel_dichtheid=0, seed=0)
+    df = ingest.maak_schoon(ruw)
+    p1, p2 = df.loc[df['Instrument'] == 'Instrument 1', 'Naam'][:2]
+    regels = [{'type': 'must_all', 'p1': p1}, {'type': 'must_all', 'p1': p2}]
+    limits = {instr: 1 for instr in limits}
+
+    model = bouw_model(df, limits, regels, presolve=False)
+    assert [los_op(model, backend)[0] for backend in ('pulp', 'highs')] == ["Infeasible"] * 2
+
+
+def test_run_solver_backends_zelfde_contract():
+    # Zelfde status en een rooster met dezelfde rijen en shows, via run_solver
+    ruw, limits, regels = genereer_rooster(30, 3, 6, seed=4)
+    df = ingest.maak_schoon(ruw)
+    pulp_status, pulp_rooster = run_solver(df, limits, regels, backend='pulp', gap=0)
+    highs_status, highs_rooster = run_solver(df, limits, regels, backend='highs', gap=0)
+
+    assert pulp_status == highs_status
+    assert pulp_status in OPLOSSING_GEVONDEN
+    assert pulp_rooster.namen == highs_rooster.namen
+    assert pulp_rooster.instrumenten == highs_rooster.instrumenten
+    assert pulp_rooster.momenten == highs_rooster.momenten
+
+
+@pytest.mark.parametrize("seed, venster, overlap", [(1, 4, 1), (1, 3, 0), (16, 3, 0), (26, 4, 1)])
+def test_rollend_haalbaar_als_geheel_haalbaar(seed, venster, overlap):
+    # Vroege vensters mogen de Wens niet opmaken voor een force_show verderop
+    ruw, limits, regels = genereer_rooster(40, 3, 12, multi=0.2, regel_dichtheid=0.05, seed=seed)
+    df = ingest.maak_schoon(ruw)
+    assert run_solver(df, limits, regels)[0] == "Optimal"
+    assert run_solver(df, limits, regels, venster=venster, overlap=overlap)[0] in OPLOSSING_GEVONDEN
@@ -0,0 +1,99 @@
+import logging
+
+import pandas as pd
+
+from solver import cijfer_matrix
+
+logger = logging.getLogger(__name__)
+
+# Kolommen in een rooster die geen show zijn
+NIET_SHOWS = ['Naam', 'Instrument', 'Wens', 'Label', 'Resource_ID', 'Totaal']
+
+
+def validate_schedule(schedule, limits, rules, df=None, shows=None):
+    # Controleert een (bewerkt) rooster op alles wat run_solver afdwingt en geeft
+    # de overtredingen terug als leesbare meldingen (lege lijst = in orde).
+    # schedule: Naam, Instrument en per show True/False of "✅"/"."
+    # df: het ingelezen rooster; dan worden ook Wens en beschikbaarheid (0 = kan niet) gecontroleerd
+    # Een Rooster uit de solver mag ook direct.
+    if hasattr(schedule, 'als_bool'):
+        schedule = schedule.als_bool()
+    if shows is None:
+        shows = [c for c in schedule.columns if c not in NIET_SHOWS]
+    schedule = schedule.reset_index(drop=True)
+    ingezet = schedule[shows].isin([True, "✅"])
+    fouten_log = []
+
+    # Tellingen in één keer: per instrument en per persoon, per show
+    per_instr = ingezet.groupby(schedule['Instrument'], sort=False).sum()
+    per_persoon = ingezet.groupby(schedule['Naam'], sort=False).sum()
+    actief = per_persoon > 0
+
+    # --- CHECK 1: LIMIETEN (Capaciteit) ---
+    maxima = pd.Series(limits, dtype=float).reindex(per_instr.index)
+    te_veel = per_instr.gt(maxima, axis=0).stack()
+    for instr, show in te_veel[te_veel].index:
+        fouten_log.append(f"⚠️ **Capaciteit:** Bij {show} zitten er **{per_instr.at[instr, show]}** {instr}s (Max = {limits[instr]}).")
+
+    # --- CHECK 2: FYSIEKE ONMOGELIJKHEID (De Octopus Check 🐙) ---
+    dubbel = (per_persoon > 1).stack()
+    for naam, show in dubbel[dubbel].index:
+        welke_instr = schedule.loc[(schedule['Naam'] == naam) & ingezet[show], 'Instrument'].tolist()
+        fouten_log.append(f"🐙 **Onmogelijk:** {naam} speelt in {show} op **{per_persoon.at[naam, show]}** instrumenten tegelijk ({' en '.join(welke_instr)}).")
+
+    if df is not None:
+        invoer = df.dropna(subset=['Naam']).drop_duplicates(['Naam', 'Instrument'])
+
+        # --- CHECK 3: WENS (totaal aantal shows, 1 meer of minder mag) ---
+        wensen = pd.to_numeric(invoer.groupby('Naam')['Wens'].first(), errors='coerce')
+        wensen = wensen[wensen > 0].reindex(per_persoon.index).dropna()
+        totalen = per_persoon.sum(axis=1).reindex(wensen.index)
+        buiten = totalen[(totalen < wensen - 1) | (totalen > wensen + 1)]
+        for naam, totaal in buiten.items():
+            gewenst = int(wensen[naam])
+            fouten_log.append(f"🎯 **Wens:** {naam} speelt {totaal} shows (wens {gewenst}, dus {gewenst - 1} tot {gewenst + 1}).")
+
+        # --- CHECK 4: BESCHIKBAARHEID (0 = kan niet) ---
+        sleutels = pd.MultiIndex.from_frame(schedule[['Naam', 'Instrument']])
+        invoer_shows = [s for s in shows if s in invoer.columns]
+        cijfers = pd.DataFrame(cijfer_matrix(invoer, invoer_shows), columns=invoer_shows,
+                               index=pd.MultiIndex.from_frame(invoer[['Naam', 'Instrument']]))
+        kan_niet = (cijfers.reindex(sleutels).to_numpy() == 0) & ingezet[invoer_shows].to_numpy()
+        for rij, kolom in zip(*kan_niet.nonzero()):
+            fouten_log.append(f"🚫 **Kan niet:** {schedule.at[rij, 'Naam']} heeft bij {invoer_shows[kolom]} een 0 ingevuld.")
+
+    # --- CHECK 5: REGELS (User Defined) ---
+    def actief_van(naam):
+        return actief.reindex([naam], fill_value=False).iloc[0]
+
+    for r in rules:
+        try:
+            p1_active = actief_van(r.get('p1'))
+
+            if r['type'] == 'conflict':
+                # Heeft P1 ergens een vinkje? EN P2 ook?
+                if (p1_active & actief_van(r.get('p2'))).any():
+                    fouten_log.append(f"⚡ Conflict: {r['p1']} & {r['p2']} samen ingedeeld.")
+
+            elif r['type'] == 'samen':
+                if not p1_active.equals(actief_van(r.get('p2'))):
+                    fouten_log.append(f"🔗 Samen: {r['p1']} en {r['p2']} lopen niet gelijk.")
+
+            elif r['type'] == 'must_all':
+                if not p1_active.all():
+                    missing_shows = p1_active[~p1_active].index.tolist()
+                    fouten_log.append(f"🔒 **Verplicht:** {r['p1']} mist: {', '.join(missing_shows)}")
+
+            elif r['type'] == 'force_show':
+                target = r['show']
+                if not p1_active[target]:
+                    fouten_log.append(f"📍 **Verplicht:** {r['p1']} mist in {target}.")
+
+            elif r['type'] == 'min_shows':
+                count = per_persoon.reindex([r['p1']], fill_value=0).iloc[0].sum()
+                if count < r['count']:
+                    fouten_log.append(f"📉 **Minimum:** {r['p1']} heeft {count} shows (min {r['count']}).")
+        except Exception as e:
+            logger.warning("Fout bij controle van regel %s: %s", r, e)
+
+    return fouten_log